@@ -0,0 +1,22 @@
+# The catalog core: ingest, storage and queries, without GTK. YAML, gzip and the XML
+# parser are only imported once an ingest actually runs.
+from .db import connection, ensure_setup, invalidate_setup, close_connection
+from .records import AppCard, AppDetail, AppDetailCache
+from .schema import create_db
+from .fuzzy import TrigramIndex, trigram_index
+from .ingest import populate_db, populate_flatpak_apps, nix_attribute_guess
+from .queries import (
+    CATEGORY_MAP,
+    ROTATION_CATEGORIES,
+    SOURCE_CATALOGS,
+    SOURCE_TYPE_FILTERS,
+    rotate_featured,
+    ensure_featured_rotation,
+    get_apps_by_category,
+    search_local_apps,
+    get_app_details_from_db,
+    app_details,
+    resolve_app_ids,
+)
+from .installed import refresh_installed, installed_watch_paths
+from .refresh import refresh_catalog, prepare_catalog, ensure_db
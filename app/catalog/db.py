@@ -0,0 +1,66 @@
+import os
+import threading
+
+from . import paths
+
+DB_PATH = paths.DB_PATH
+
+# Statements are cached per connection by their SQL text, so queries keep their text constant.
+CACHED_STATEMENTS = 256
+
+READ_PRAGMAS = (
+    'PRAGMA journal_mode = WAL',
+    'PRAGMA synchronous = NORMAL',
+    'PRAGMA temp_store = MEMORY',
+    'PRAGMA mmap_size = 268435456',
+    'PRAGMA cache_size = -32768',
+)
+
+_local = threading.local()
+_setup_lock = threading.Lock()
+_setup_done = False
+
+
+def _open_connection(path):
+    # sqlite3 is first needed on the indexing thread, so the window doesn't wait for it.
+    import sqlite3
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    conn = sqlite3.connect(path, timeout=30, cached_statements=CACHED_STATEMENTS)
+    for pragma in READ_PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+
+def connection():
+    conn = getattr(_local, 'conn', None)
+    if conn is None or getattr(_local, 'path', None) != DB_PATH:
+        if conn is not None:
+            conn.close()
+        conn = _open_connection(DB_PATH)
+        _local.conn = conn
+        _local.path = DB_PATH
+    return conn
+
+
+def ensure_setup(setup):
+    global _setup_done
+    if _setup_done:
+        return
+    with _setup_lock:
+        if not _setup_done:
+            setup(connection())
+            _setup_done = True
+
+
+def invalidate_setup():
+    global _setup_done
+    with _setup_lock:
+        _setup_done = False
+
+
+def close_connection():
+    conn = getattr(_local, 'conn', None)
+    if conn is not None:
+        conn.close()
+        _local.conn = None
@@ -0,0 +1,124 @@
+import html
+import re
+
+# Only tags are matched; the text between two tags is handled as one run.
+DESCRIPTION_TAG = re.compile(r'<(/?)([a-zA-Z][a-zA-Z0-9]*)[^<>]*?(/?)>')
+
+INLINE_TAGS = {
+    'em': 'i',
+    'i': 'i',
+    'strong': 'b',
+    'b': 'b',
+    'code': 'tt',
+    'tt': 'tt',
+}
+
+# How many line breaks must separate what comes before from what comes after.
+BLOCK_BREAKS = {
+    'p': 2,
+    'ul': 2,
+    'ol': 2,
+    'li': 1,
+    'br': 1,
+}
+
+
+def description_to_pango(text):
+    if not text:
+        return ''
+
+    out = []
+    pending_breaks = 0
+    pending_space = False
+    open_inline = []
+    lists = []
+
+    def append_text(run):
+        nonlocal pending_breaks, pending_space
+        words = run.split()
+        if not words:
+            pending_space = bool(out)
+            return
+
+        if run[0].isspace():
+            pending_space = bool(out)
+        if pending_breaks and out:
+            out.append('\n' * pending_breaks)
+        elif pending_space:
+            out.append(' ')
+        pending_breaks = 0
+        out.append(html.escape(html.unescape(' '.join(words)), quote=False))
+        pending_space = run[-1].isspace()
+
+    position = 0
+    for match in DESCRIPTION_TAG.finditer(text):
+        start, end = match.span()
+        if start > position:
+            append_text(text[position:start])
+        position = end
+
+        closing, tag, self_closing = match.groups()
+        tag = tag.lower()
+        closing = closing == '/'
+        self_closing = self_closing == '/'
+
+        if tag in INLINE_TAGS:
+            pango_tag = INLINE_TAGS[tag]
+            if closing:
+                if pango_tag in open_inline:
+                    # Close anything opened inside it first so the markup stays well nested.
+                    while open_inline:
+                        inner = open_inline.pop()
+                        out.append(f'</{inner}>')
+                        if inner == pango_tag:
+                            break
+            elif not self_closing:
+                if pending_breaks and out:
+                    out.append('\n' * pending_breaks)
+                elif pending_space:
+                    out.append(' ')
+                pending_breaks = 0
+                pending_space = False
+                out.append(f'<{pango_tag}>')
+                open_inline.append(pango_tag)
+            continue
+
+        # Inline formatting never spans blocks, even when the source forgets to close it.
+        while open_inline:
+            out.append(f'</{open_inline.pop()}>')
+
+        breaks = BLOCK_BREAKS.get(tag)
+        if tag in ('ul', 'ol'):
+            if closing:
+                if lists:
+                    lists.pop()
+            else:
+                lists.append([tag, 0])
+            # Nested lists continue their parent item instead of opening a new paragraph.
+            if len(lists) > (0 if closing else 1):
+                breaks = BLOCK_BREAKS['li']
+        elif tag == 'li' and not closing:
+            pending_breaks = max(pending_breaks, BLOCK_BREAKS['li'] if out else 0)
+            if pending_breaks and out:
+                out.append('\n' * pending_breaks)
+            pending_breaks = 0
+            indent = '  ' * max(len(lists) - 1, 0)
+            if lists and lists[-1][0] == 'ol':
+                lists[-1][1] += 1
+                out.append(f'{indent}{lists[-1][1]}. ')
+            else:
+                out.append(f'{indent}• ')
+            pending_space = False
+            continue
+
+        if breaks:
+            pending_breaks = max(pending_breaks, breaks)
+            pending_space = False
+
+    if position < len(text):
+        append_text(text[position:])
+
+    while open_inline:
+        out.append(f'</{open_inline.pop()}>')
+
+    return ''.join(out).strip()
@@ -0,0 +1,135 @@
+import heapq
+import math
+import re
+from array import array
+from collections import Counter
+from itertools import chain
+
+from tracing import traced
+
+FUZZY_WORD = re.compile(r'[^\W_]+')
+
+# How much of a catalog word's trigrams a query word has to share with it (Jaccard) to match.
+FUZZY_MIN_SIMILARITY = 0.3
+
+
+def _trigrams(word):
+    # Padding the word like pg_trgm does lets short words and word starts weigh in.
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TrigramIndex:
+    # Trigrams point at distinct catalog words and words at the apps using them, both as
+    # array('I') postings: "gnome" or "org" is one entry per trigram however many apps share it.
+    def __init__(self):
+        self._index = None
+
+    @traced('search.fuzzy_build')
+    def build(self, conn):
+        app_keys = []
+        app_name_lengths = array('B')
+        word_numbers = {}
+        word_apps = []
+        for source_type, app_id, name, nix_package_attribute in conn.execute(
+                'SELECT source_type, id, name, nix_package_attribute FROM apps ORDER BY rowid'):
+            app = len(app_keys)
+            app_keys.append((source_type, app_id))
+            name_words = FUZZY_WORD.findall((name or '').lower())
+            app_name_lengths.append(min(len(name_words), 0xFF))
+            words = set(name_words)
+            if nix_package_attribute and nix_package_attribute != 'N/A':
+                words.update(FUZZY_WORD.findall(nix_package_attribute.lower()))
+            for word in words:
+                number = word_numbers.get(word)
+                if number is None:
+                    number = word_numbers[word] = len(word_apps)
+                    word_apps.append(array('I'))
+                word_apps[number].append(app)
+
+        word_sizes = array('H')
+        postings = {}
+        for word in word_numbers:
+            trigrams = _trigrams(word)
+            word_sizes.append(min(len(trigrams), 0xFFFF))
+            number = len(word_sizes) - 1
+            for trigram in trigrams:
+                posting = postings.get(trigram)
+                if posting is None:
+                    posting = postings[trigram] = array('I')
+                posting.append(number)
+
+        # Swapped in whole, so searches running meanwhile keep using the previous index.
+        self._index = (tuple(app_keys), app_name_lengths, tuple(word_apps), word_sizes, postings)
+
+    def ensure(self, conn):
+        if self._index is None:
+            self.build(conn)
+
+    @traced('search.fuzzy')
+    def search(self, query, limit, source_types=None, min_similarity=FUZZY_MIN_SIMILARITY):
+        index = self._index
+        query_words = list(dict.fromkeys(FUZZY_WORD.findall(query.lower())))
+        if index is None or not query_words:
+            return []
+
+        app_keys, app_name_lengths = index[:2]
+        word_scores = [self._similar_apps(index, word, min_similarity) for word in query_words]
+        if len(word_scores) == 1:
+            scores = word_scores[0]
+        else:
+            # Each query word adds its best match, so apps matching only some of them rank lower.
+            scores = {}
+            for app in set().union(*word_scores):
+                mean = sum(word_score.get(app, 0.0) for word_score in word_scores) / len(word_scores)
+                if mean >= min_similarity - 1e-9:
+                    scores[app] = mean
+
+        # Filtered before ranking, so one source's matches can't crowd another's out of the limit.
+        if source_types is not None:
+            scores = {app: score for app, score in scores.items() if app_keys[app][0] in source_types}
+
+        if len(scores) > limit:
+            cutoff = heapq.nlargest(limit, scores.values())[-1]
+            ranked = [app for app, score in scores.items() if score >= cutoff]
+        else:
+            ranked = list(scores)
+        # Stable sorts, last key first: best score, then the shortest name, then catalog order.
+        ranked.sort()
+        ranked.sort(key=app_name_lengths.__getitem__)
+        ranked.sort(key=scores.__getitem__, reverse=True)
+        return [(app_keys[app], scores[app]) for app in ranked[:limit]]
+
+    def _similar_apps(self, index, word, min_similarity):
+        word_apps, word_sizes, postings = index[2:]
+        query_postings = sorted((postings.get(trigram, ()) for trigram in _trigrams(word)), key=len)
+        query_size = len(query_postings)
+
+        # A word reaching min_similarity shares at least min_shared trigrams with the query word,
+        # so it shows up in one of the rarest (query_size - min_shared + 1) postings. Only those
+        # produce candidates; the common ones are just intersected with them.
+        min_shared = max(1, math.ceil(min_similarity * query_size))
+        rare_count = query_size - min_shared + 1
+        shared_counts = Counter(chain.from_iterable(query_postings[:rare_count]))
+        if not shared_counts:
+            return {}
+        candidates = set(shared_counts)
+        for posting in query_postings[rare_count:]:
+            shared_counts.update(candidates.intersection(posting))
+
+        # Jaccard similarity: shared trigrams over the trigrams of both words together.
+        matches = []
+        for number, shared in shared_counts.items():
+            similarity = shared / (query_size + word_sizes[number] - shared)
+            if similarity >= min_similarity - 1e-9:
+                matches.append((similarity, number))
+        matches.sort()
+
+        # Ascending, so an app using several matching words keeps its best one.
+        scores = {}
+        for similarity, number in matches:
+            scores.update(dict.fromkeys(word_apps[number], similarity))
+        return scores
+
+
+trigram_index = TrigramIndex()
@@ -0,0 +1,255 @@
+import json
+import os
+import re
+
+from tracing import traced
+
+from . import paths
+from .description_markup import description_to_pango
+from .schema import APP_UPSERT_SQL, CATEGORY_COLUMN
+
+INGEST_BATCH_SIZE = 5000
+
+# Counted over components read, not written, so a refresh that rewrites little still reports.
+INGEST_PROGRESS_INTERVAL = 1000
+
+NIX_ATTRIBUTE_SEPARATORS = re.compile(r'[._]')
+
+
+def _write_app_rows(c, source_type, rows):
+    c.executemany(APP_UPSERT_SQL, rows)
+    c.executemany('DELETE FROM app_categories WHERE source_type = ? AND app_id = ?', ((source_type, row[0]) for row in rows))
+    c.executemany(
+        'INSERT OR IGNORE INTO app_categories (source_type, app_id, category) VALUES (?, ?, ?)',
+        ((source_type, row[0], category) for row in rows for category in json.loads(row[CATEGORY_COLUMN]) if category))
+
+
+def _sync_source_rows(conn, source_type, rows, progress=None):
+    import hashlib
+
+    # Only (id, hash) pairs are held while diffing, so a refresh stays as lean as a cold build.
+    c = conn.cursor()
+    existing = dict(c.execute('SELECT id, content_hash FROM apps WHERE source_type = ?', (source_type,)))
+
+    batch = []
+    processed = 0
+    with conn:
+        for row in rows:
+            processed += 1
+            if progress and processed % INGEST_PROGRESS_INTERVAL == 0:
+                progress(processed)
+
+            content_hash = hashlib.blake2b(json.dumps(row).encode(), digest_size=16).hexdigest()
+            if existing.pop(row[0], None) == content_hash:
+                continue
+
+            batch.append(row + (content_hash,))
+            if len(batch) >= INGEST_BATCH_SIZE:
+                _write_app_rows(c, source_type, batch)
+                batch.clear()
+
+        if batch:
+            _write_app_rows(c, source_type, batch)
+
+        # Whatever is left in `existing` no longer appears in the source.
+        if existing:
+            c.executemany('DELETE FROM apps WHERE source_type = ? AND id = ?', ((source_type, app_id) for app_id in existing))
+
+    if progress:
+        progress(processed)
+
+
+def nix_attribute_guess(app_id):
+    # org.gnome.Calculator.desktop -> org-gnome-calculator: only a stand-in for catalogs that
+    # don't name the package, and rarely the attribute nixpkgs actually uses.
+    attribute = app_id.lower()
+    if attribute.endswith('.desktop'):
+        attribute = attribute[:-len('.desktop')]
+    return NIX_ATTRIBUTE_SEPARATORS.sub('-', attribute)
+
+
+def _localized(value):
+    return value.get('C') if isinstance(value, dict) else value
+
+
+def _appstream_row(doc):
+    if not isinstance(doc, dict) or doc.get("Type") != "desktop-application":
+        return None
+
+    app_id = doc.get("ID")
+    if not app_id:
+        return None
+
+    # DEP-11 names the package a component ships in, which is what a nix profile records.
+    package = doc.get('Package')
+    nix_package_attribute = package if isinstance(package, str) and package else nix_attribute_guess(app_id)
+
+    name = _localized(doc.get('Name', 'Unknown'))
+    summary = _localized(doc.get('Summary', 'No summary'))
+    description = _localized(doc.get('Description', 'No description'))
+
+    icon_name = 'application-x-executable'
+    icon_info = doc.get('Icon', {})
+    if isinstance(icon_info, dict) and icon_info.get('cached'):
+        cached_entry = icon_info['cached'][0]
+        if isinstance(cached_entry, dict):
+            icon_name = cached_entry.get('name', icon_name)
+    elif isinstance(icon_info, str):
+        icon_name = icon_info
+
+    developer_data = doc.get('Developer', {})
+    developer = 'N/A'
+    if isinstance(developer_data, dict):
+        developer = _localized(developer_data.get('name', {})) or 'N/A'
+
+    license_str = doc.get('ProjectLicense', 'N/A')
+
+    url_data = doc.get('Url', {})
+    homepage_url = url_data.get('homepage', 'N/A') if isinstance(url_data, dict) else 'N/A'
+
+    screenshots = []
+    for shot in doc.get('Screenshots', ()):
+        url = shot.get('source-image', {}).get('url') if isinstance(shot, dict) else None
+        if url:
+            screenshots.append(url)
+
+    categories = doc.get('Categories') or ["Uncategorized"]
+
+    keywords = _localized(doc.get('Keywords')) or ()
+    if isinstance(keywords, str):
+        keywords = (keywords,)
+
+    return (app_id, name, summary, description, description_to_pango(description), icon_name, developer, license_str, homepage_url,
+            json.dumps(screenshots), json.dumps(categories), ' '.join(map(str, keywords)), nix_package_attribute, None, None, 'local_appstream')
+
+
+def _appstream_rows(path):
+    # The parsers are only imported once a catalog actually has to be ingested,
+    # which a warm start never does.
+    import gzip
+    import yaml
+
+    loader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+    # LibYAML reads the gzip byte stream directly and yields one component at a time,
+    # so the catalog is never held in memory as a whole.
+    with gzip.open(path, 'rb') as f:
+        for doc in yaml.load_all(f, Loader=loader):
+            row = _appstream_row(doc)
+            if row is not None:
+                yield row
+
+
+@traced('db.populate_db')
+def populate_db(conn, progress=None):
+    if not paths.APPSTREAM_YAML_PATH or not os.path.isfile(paths.APPSTREAM_YAML_PATH):
+        return
+
+    _sync_source_rows(conn, 'local_appstream', _appstream_rows(paths.APPSTREAM_YAML_PATH), progress)
+
+
+XML_LANG = '{http://www.w3.org/XML/1998/namespace}lang'
+
+FLATPAK_TEXT_FIELDS = ('name', 'summary', 'developer_name', 'project_license')
+
+
+def _flatpak_row(component):
+    import xml.etree.ElementTree as ET
+
+    if component.get('type') not in ('desktop', 'desktop-application'):
+        return None
+
+    # One walk over the children; untranslated elements win over the first translated one.
+    fields = {}
+    translated_fields = {}
+    description_element = None
+    icon_name = None
+    homepage_url = None
+    screenshots_list = []
+    categories_list = []
+    keywords = []
+
+    for child in component:
+        tag = child.tag
+        if tag == 'id':
+            fields.setdefault('id', child.text)
+        elif tag in FLATPAK_TEXT_FIELDS:
+            target = fields if child.get(XML_LANG) is None else translated_fields
+            target.setdefault(tag, child.text)
+        elif tag == 'description':
+            if description_element is None or child.get(XML_LANG) is None:
+                description_element = child
+        elif tag == 'icon':
+            if icon_name is None and child.get('type') == 'cached':
+                icon_name = child.text
+        elif tag == 'url':
+            if homepage_url is None and child.get('type') == 'homepage':
+                homepage_url = child.text
+        elif tag == 'screenshots':
+            for screenshot in child:
+                for image in screenshot.iterfind('image'):
+                    screenshots_list.append(image.text)
+        elif tag == 'categories':
+            categories_list.extend(category.text for category in child.iterfind('category'))
+        elif tag == 'keywords':
+            keywords.extend(keyword.text for keyword in child.iterfind('keyword') if keyword.text)
+
+    app_id = fields.get('id')
+    if not app_id:
+        return None
+
+    for tag, value in translated_fields.items():
+        fields.setdefault(tag, value)
+
+    if description_element is not None:
+        description = ''.join(description_element.itertext())
+        # The element's own markup, re-serialized so it renders like the YAML catalog's HTML.
+        description_markup = description_to_pango((description_element.text or '') + ''.join(
+            ET.tostring(child, encoding='unicode') for child in description_element))
+    else:
+        description = 'No description'
+        description_markup = description
+
+    return (app_id, fields.get('name', 'Unknown'), fields.get('summary', 'No summary'), description, description_markup,
+            icon_name or 'application-x-executable', fields.get('developer_name', 'N/A'),
+            fields.get('project_license', 'N/A'), homepage_url or 'N/A',
+            json.dumps(screenshots_list), json.dumps(categories_list or ["Uncategorized"]), ' '.join(keywords),
+            None, app_id, 'flathub', 'flatpak')
+
+
+def _flatpak_rows(path):
+    import gzip
+    import xml.etree.ElementTree as ET
+
+    # iterparse hands over each <component> as soon as it is complete; clearing it (and the
+    # root's reference to it) afterwards keeps memory flat however large the catalog is.
+    with gzip.open(path, 'rb') as f:
+        root = None
+        depth = 0
+        for event, element in ET.iterparse(f, events=('start', 'end')):
+            if event == 'start':
+                if root is None:
+                    root = element
+                elif element.tag == 'component':
+                    depth += 1
+                continue
+
+            if element.tag != 'component':
+                continue
+            depth -= 1
+            if depth:
+                continue
+
+            row = _flatpak_row(element)
+            element.clear()
+            root.clear()
+            if row is not None:
+                yield row
+
+
+@traced('db.populate_flatpak_apps')
+def populate_flatpak_apps(conn, progress=None):
+    if not os.path.isfile(paths.FLATPAK_APPSTREAM_PATH):
+        return
+
+    _sync_source_rows(conn, 'flatpak', _flatpak_rows(paths.FLATPAK_APPSTREAM_PATH), progress)
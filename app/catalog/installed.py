@@ -0,0 +1,115 @@
+import json
+import os
+import re
+
+from tracing import traced
+
+from . import paths
+
+NIX_ATTRIBUTE_PREFIXES = ('legacyPackages', 'packages')
+
+NIX_STORE_NAME = re.compile(r'[0-9a-z]{32}-(.+)')
+
+
+def _store_path_pname(store_path):
+    # /nix/store/<hash>-gnome-calculator-46.1 holds gnome-calculator: like nix's own name
+    # parsing, the version starts at the first dash that isn't followed by a letter.
+    match = NIX_STORE_NAME.fullmatch(os.path.basename(store_path))
+    if not match:
+        return None
+    name = match.group(1)
+    for i in range(len(name) - 1):
+        if name[i] == '-' and not name[i + 1].isalpha():
+            return name[:i]
+    return name
+
+
+def _nix_profile_attributes(manifest_path):
+    try:
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return set()
+
+    # Version 2 manifests list their elements, version 3 keys them by name.
+    elements = manifest.get('elements', ()) if isinstance(manifest, dict) else ()
+    if isinstance(elements, dict):
+        elements = elements.items()
+    else:
+        elements = ((None, element) for element in elements)
+
+    # Every name an element is known by: its attribute, its element name and the package
+    # names of its store paths, so whichever one the catalog carries can match.
+    attributes = set()
+    for name, element in elements:
+        if not isinstance(element, dict) or not element.get('active', True):
+            continue
+        if name:
+            attributes.add(name)
+        attr_path = element.get('attrPath')
+        if attr_path:
+            # legacyPackages.x86_64-linux.firefox installs what the catalog calls firefox.
+            parts = attr_path.split('.')
+            if len(parts) > 2 and parts[0] in NIX_ATTRIBUTE_PREFIXES:
+                attr_path = '.'.join(parts[2:])
+            attributes.add(attr_path)
+        for store_path in element.get('storePaths') or ():
+            pname = _store_path_pname(store_path) if isinstance(store_path, str) else None
+            if pname:
+                attributes.add(pname)
+    return attributes
+
+
+def _flatpak_app_ids(app_dir):
+    try:
+        with os.scandir(app_dir) as entries:
+            return {entry.name for entry in entries if os.path.exists(os.path.join(entry.path, 'current'))}
+    except OSError:
+        return set()
+
+
+def _mtime_ns(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def installed_fingerprint():
+    # Every nix profile generation is a new store path (with a fixed mtime), so the resolved
+    # manifest path is what changes; Flatpak adds and removes directories under app/.
+    manifests = [os.path.realpath(os.path.join(link, 'manifest.json')) for link in paths.NIX_PROFILE_LINKS]
+    return json.dumps(
+        [[manifest, _mtime_ns(manifest)] for manifest in manifests]
+        + [[app_dir, _mtime_ns(app_dir)] for app_dir in paths.FLATPAK_INSTALL_DIRS])
+
+
+def installed_watch_paths():
+    # The directories whose entries change when something is installed or removed.
+    watch_paths = []
+    for link in paths.NIX_PROFILE_LINKS:
+        if os.path.islink(link):
+            profile = os.path.join(os.path.dirname(link), os.readlink(link))
+            watch_paths.append(os.path.dirname(os.path.normpath(profile)))
+    watch_paths.extend(app_dir for app_dir in paths.FLATPAK_INSTALL_DIRS if os.path.isdir(app_dir))
+    return list(dict.fromkeys(watch_paths))
+
+
+@traced('db.refresh_installed')
+def refresh_installed(conn):
+    fingerprint = installed_fingerprint()
+    row = conn.execute("SELECT value FROM catalog_meta WHERE key = 'installed_fingerprint'").fetchone()
+    if row and row[0] == fingerprint:
+        return False
+
+    installed = set()
+    for link in paths.NIX_PROFILE_LINKS:
+        installed.update(('nix', attribute) for attribute in _nix_profile_attributes(os.path.join(link, 'manifest.json')))
+    for app_dir in paths.FLATPAK_INSTALL_DIRS:
+        installed.update(('flatpak', app_id) for app_id in _flatpak_app_ids(app_dir))
+
+    with conn:
+        conn.execute('DELETE FROM installed_apps')
+        conn.executemany('INSERT INTO installed_apps (kind, ref) VALUES (?, ?)', installed)
+        conn.execute("INSERT OR REPLACE INTO catalog_meta (key, value) VALUES ('installed_fingerprint', ?)", (fingerprint,))
+    return True
@@ -0,0 +1,32 @@
+import os
+
+CACHE_DIR = os.path.expanduser('~/.cache')
+
+DB_PATH = os.path.join(CACHE_DIR, 'alloy_store_apps.db')
+
+SCREENSHOT_CACHE_DIR = os.path.join(CACHE_DIR, 'alloy_store_screenshots')
+
+APPSTREAM_YAML_PATH = os.environ.get("NIXOS_APPSTREAM_DATA")
+
+# nixos-appstream-data ships its icons next to the catalog: share/app-info/{xmls,icons}.
+NIXOS_ICONS_DIR = None
+if APPSTREAM_YAML_PATH and os.path.isfile(APPSTREAM_YAML_PATH):
+    NIXOS_ICONS_DIR = os.path.join(os.path.dirname(os.path.dirname(APPSTREAM_YAML_PATH)), "icons", "nixos")
+
+FLATPAK_USER_DIR = os.path.join(os.path.expanduser('~'), '.local', 'share', 'flatpak')
+
+FLATPAK_SYSTEM_DIR = '/var/lib/flatpak'
+
+FLATHUB_APPSTREAM_DIR = os.path.join(FLATPAK_USER_DIR, 'appstream', 'flathub', 'x86_64', 'active')
+
+FLATPAK_APPSTREAM_PATH = os.path.join(FLATHUB_APPSTREAM_DIR, 'appstream.xml.gz')
+
+FLATPAK_ICONS_PATH = os.path.join(FLATHUB_APPSTREAM_DIR, 'icons')
+
+# Installed Flatpak apps are directories named after their app ID.
+FLATPAK_INSTALL_DIRS = (os.path.join(FLATPAK_USER_DIR, 'app'), os.path.join(FLATPAK_SYSTEM_DIR, 'app'))
+
+# The classic and the XDG location of the user's nix profile.
+NIX_PROFILE_LINKS = (os.path.expanduser('~/.nix-profile'), os.path.expanduser('~/.local/state/nix/profile'))
+
+PLACEHOLDER_PATH = os.path.join(os.path.dirname(__file__), "..", "..", "images", "placeholder.png")
@@ -0,0 +1,231 @@
+import datetime
+import random
+import re
+
+from tracing import traced
+
+from . import db
+from .fuzzy import trigram_index
+from .records import AppCard, AppDetail, AppDetailCache
+from .schema import FTS_TEXT_COLUMNS
+
+# bm25 weights, in FTS_COLUMNS order: a name hit outranks anything else, the source never counts.
+FTS_RANK_WEIGHTS = (10.0, 4.0, 1.0, 2.0, 5.0, 0.0)
+
+FTS_RANK_EXPRESSION = 'bm25(apps_fts, {})'.format(', '.join(str(weight) for weight in FTS_RANK_WEIGHTS))
+
+FTS_TOKEN = re.compile(r'\w+')
+
+# Shorter prefixes aren't in the prefix index and would expand to most of the vocabulary.
+FTS_MIN_PREFIX = 2
+
+CATEGORY_MAP = {
+    "Games": "Game",
+    "Socialize": "Network",
+    "Work": "Office",
+    "Development": "Development",
+}
+
+# Featured plus every sidebar category gets a precomputed shuffle per source.
+ROTATION_CATEGORIES = ("Featured",) + tuple(CATEGORY_MAP.values())
+
+ROTATION_SOURCES = ("nixpkgs", "flatpak", "all")
+
+# Which ingested catalog backs each source in the header dropdown.
+SOURCE_CATALOGS = {
+    "nixpkgs": "local_appstream",
+    "flatpak": "flatpak",
+}
+
+# The source_type values behind each source, for filtering outside of SQL.
+SOURCE_TYPES = {
+    "nixpkgs": ('local_appstream', 'nixpkgs_search'),
+    "flatpak": ('flatpak',),
+}
+
+FTS_SOURCE_FILTERS = {
+    source: 'source_type : ({})'.format(' OR '.join(f'"{value}"' for value in values))
+    for source, values in SOURCE_TYPES.items()
+}
+
+SOURCE_TYPE_FILTERS = {
+    "nixpkgs": "apps.source_type IN ('local_appstream', 'nixpkgs_search')",
+    "flatpak": "apps.source_type = 'flatpak'",
+}
+
+# Whether the user has the row's app installed, answered from the installed_apps primary key.
+INSTALLED_EXPRESSION = '''EXISTS (
+    SELECT 1 FROM installed_apps
+    WHERE installed_apps.kind = CASE apps.source_type WHEN 'flatpak' THEN 'flatpak' ELSE 'nix' END
+    AND installed_apps.ref = COALESCE(apps.flatpak_ref, apps.nix_package_attribute)
+)'''
+
+# Similarity-ranked names are fetched in one go and paged from memory.
+FUZZY_CANDIDATES = 200
+
+# Stays under the host-parameter limit of older SQLite builds.
+RESOLVE_BATCH_SIZE = 500
+
+# What installing an app needs to know about it.
+APP_REF_COLUMNS = ('id', 'name', 'source_type', 'nix_package_attribute', 'flatpak_ref', 'origin')
+
+
+def _rotation_seed():
+    return datetime.date.today().isoformat()
+
+
+def rotate_featured(conn, seed=None):
+    seed = seed or _rotation_seed()
+    c = conn.cursor()
+    with conn:
+        c.execute('DELETE FROM featured_rotation')
+        for source in ROTATION_SOURCES:
+            source_filter = SOURCE_TYPE_FILTERS.get(source, '1')
+            for category in ROTATION_CATEGORIES:
+                if category == "Featured":
+                    c.execute(f'SELECT source_type, id FROM apps WHERE {source_filter} ORDER BY source_type, id')
+                else:
+                    c.execute(f'''
+                        SELECT apps.source_type, apps.id FROM app_categories
+                        JOIN apps ON apps.source_type = app_categories.source_type AND apps.id = app_categories.app_id
+                        WHERE app_categories.category = ? AND {source_filter} ORDER BY apps.source_type, apps.id
+                    ''', (category,))
+                app_keys = c.fetchall()
+                random.Random(f"{seed}:{source}:{category}").shuffle(app_keys)
+                c.executemany(
+                    'INSERT INTO featured_rotation (source, category, position, app_source_type, app_id) VALUES (?, ?, ?, ?, ?)',
+                    ((source, category, position, app_source_type, app_id)
+                     for position, (app_source_type, app_id) in enumerate(app_keys)))
+        c.execute("INSERT OR REPLACE INTO catalog_meta (key, value) VALUES ('rotation_seed', ?)", (seed,))
+
+
+@traced('db.ensure_featured_rotation')
+def ensure_featured_rotation(conn, catalog_changed=False):
+    row = conn.execute("SELECT value FROM catalog_meta WHERE key = 'rotation_seed'").fetchone()
+    seed = _rotation_seed()
+    if catalog_changed or not row or row[0] != seed:
+        rotate_featured(conn, seed)
+
+
+@traced('db.get_apps_by_category')
+def get_apps_by_category(conn, category, limit=6, source_type="local_appstream", offset=0):
+    search_category = CATEGORY_MAP.get(category, category)
+    c = conn.cursor()
+    if search_category in ROTATION_CATEGORIES:
+        rotation_source = source_type if source_type in SOURCE_TYPE_FILTERS else "all"
+        c.execute(f'''
+            SELECT apps.id, apps.name, apps.summary, apps.icon, apps.source_type, apps.nix_package_attribute,
+                   {INSTALLED_EXPRESSION}
+            FROM featured_rotation
+            JOIN apps ON apps.source_type = featured_rotation.app_source_type AND apps.id = featured_rotation.app_id
+            WHERE featured_rotation.source = ? AND featured_rotation.category = ? AND featured_rotation.position >= ?
+            ORDER BY featured_rotation.position LIMIT ?
+        ''', (rotation_source, search_category, offset, limit))
+    else:
+        source_filter = SOURCE_TYPE_FILTERS.get(source_type, '1')
+        c.execute(f'''
+            SELECT apps.id, apps.name, apps.summary, apps.icon, apps.source_type, apps.nix_package_attribute,
+                   {INSTALLED_EXPRESSION}
+            FROM app_categories JOIN apps ON apps.source_type = app_categories.source_type AND apps.id = app_categories.app_id
+            WHERE app_categories.category = ? AND {source_filter}
+            ORDER BY apps.name LIMIT ? OFFSET ?
+        ''', (search_category, limit, offset))
+    return [AppCard(*row) for row in c.fetchall()]
+
+
+def _fts_match_expression(query, source_type):
+    # Every word must match, the last one as a prefix since the user is still typing it.
+    tokens = FTS_TOKEN.findall(query)
+    if not tokens:
+        return None
+    terms = ['"{}"'.format(token.replace('"', '""')) for token in tokens]
+    if len(tokens[-1]) >= FTS_MIN_PREFIX:
+        terms[-1] += '*'
+    expression = '{{{}}} : ({})'.format(' '.join(FTS_TEXT_COLUMNS), ' '.join(terms))
+    source_filter = FTS_SOURCE_FILTERS.get(source_type)
+    if source_filter:
+        expression += f' AND {source_filter}'
+    return expression
+
+
+@traced('search.local')
+def search_local_apps(conn, query, limit=6, source_type="local_appstream", offset=0, fuzzy=True):
+    match_expression = _fts_match_expression(query, source_type)
+    if not match_expression:
+        return []
+
+    # Ranked and cut down inside apps_fts, so only the page itself is joined against apps.
+    # Ties go by catalog order, which apps_fts knows without a lookup, so pages never overlap.
+    c = conn.cursor()
+    c.execute(f'''
+        SELECT apps.id, apps.name, apps.summary, apps.icon, apps.source_type, apps.nix_package_attribute,
+               {INSTALLED_EXPRESSION}
+        FROM (
+            SELECT rowid, {FTS_RANK_EXPRESSION} AS score FROM apps_fts
+            WHERE apps_fts MATCH ? ORDER BY score, rowid LIMIT ? OFFSET ?
+        ) AS hits
+        CROSS JOIN apps ON apps.rowid = hits.rowid
+        ORDER BY hits.score, hits.rowid
+    ''', (match_expression, limit, offset))
+    rows = c.fetchall()
+    if rows or not fuzzy:
+        return [AppCard(*row) for row in rows]
+
+    # Typos match no word at all, so only queries without a single FTS hit are ranked by trigrams.
+    if offset and c.execute('SELECT 1 FROM apps_fts WHERE apps_fts MATCH ? LIMIT 1', (match_expression,)).fetchone():
+        return []
+    return _fuzzy_search(conn, query, limit, source_type, offset)
+
+
+def _fuzzy_search(conn, query, limit, source_type, offset):
+    trigram_index.ensure(conn)
+    app_keys = [app_key for app_key, similarity in trigram_index.search(
+        query, max(FUZZY_CANDIDATES, offset + limit), SOURCE_TYPES.get(source_type))]
+    if not app_keys:
+        return []
+
+    # Candidates drive the join so each is a primary-key lookup, not a scan of its whole source.
+    c = conn.cursor()
+    c.execute(f'''
+        WITH candidates (source_type, id) AS (VALUES {', '.join(['(?, ?)'] * len(app_keys))})
+        SELECT apps.id, apps.name, apps.summary, apps.icon, apps.source_type, apps.nix_package_attribute,
+               {INSTALLED_EXPRESSION}
+        FROM candidates CROSS JOIN apps ON apps.source_type = candidates.source_type AND apps.id = candidates.id
+    ''', [value for app_key in app_keys for value in app_key])
+    rows = {(row[4], row[0]): row for row in c.fetchall()}
+    cards = [AppCard(*rows[app_key]) for app_key in app_keys if app_key in rows]
+    return cards[offset:offset + limit]
+
+
+@traced('db.get_app_details')
+def get_app_details_from_db(app_id, source_type):
+    conn = db.connection()
+    c = conn.cursor()
+    c.execute(
+        'SELECT name, summary, description, description_markup, icon, developer, license, homepage, screenshots, nix_package_attribute, flatpak_ref, origin, source_type, '
+        f'{INSTALLED_EXPRESSION} FROM apps WHERE source_type = ? AND id = ?',
+        (source_type, app_id)
+    )
+    row = c.fetchone()
+    if row:
+        return AppDetail.from_row(app_id, row)
+    return None
+
+
+app_details = AppDetailCache(get_app_details_from_db)
+
+
+@traced('db.resolve_app_ids')
+def resolve_app_ids(conn, app_ids, source_type="all"):
+    # An ID shipped by both catalogs resolves to one entry per source, in source_type order.
+    resolved = {}
+    unique_ids = list(dict.fromkeys(app_ids))
+    source_filter = SOURCE_TYPE_FILTERS.get(source_type, '1')
+    c = conn.cursor()
+    for start in range(0, len(unique_ids), RESOLVE_BATCH_SIZE):
+        batch = unique_ids[start:start + RESOLVE_BATCH_SIZE]
+        c.execute('SELECT {} FROM apps WHERE id IN ({}) AND {} ORDER BY source_type'.format(
+            ', '.join(f'apps.{column}' for column in APP_REF_COLUMNS), ', '.join('?' * len(batch)), source_filter), batch)
+        for row in c.fetchall():
+            resolved.setdefault(row[0], []).append(dict(zip(APP_REF_COLUMNS, row)))
+    return resolved
@@ -0,0 +1,106 @@
+import json
+import threading
+from collections import OrderedDict
+
+APP_DETAIL_CACHE_SIZE = 128
+
+
+class AppCard:
+    # The projection lists need: landing grids, search rows and nix search hits.
+    __slots__ = ('id', 'name', 'summary', 'icon', 'source_type', 'nix_package_attribute', 'installed')
+
+    def __init__(self, id, name, summary, icon, source_type, nix_package_attribute=None, installed=False):
+        self.id = id
+        self.name = name
+        self.summary = summary
+        self.icon = icon
+        self.source_type = source_type
+        self.nix_package_attribute = nix_package_attribute
+        self.installed = bool(installed)
+
+    def __repr__(self):
+        return f"AppCard({self.id!r}, {self.source_type!r})"
+
+
+class AppDetail:
+    __slots__ = (
+        'id', 'name', 'summary', 'description', 'description_markup', 'icon', 'developer', 'license', 'homepage',
+        'screenshots', 'nix_package_attribute', 'flatpak_ref', 'origin', 'source_type', 'installed'
+    )
+
+    def __init__(self, id, name, summary, description, icon, developer, license, homepage,
+                 screenshots, nix_package_attribute=None, flatpak_ref=None, origin=None,
+                 source_type='local_appstream', description_markup=None, installed=False):
+        self.id = id
+        self.name = name
+        self.summary = summary
+        self.description = description
+        # Pango markup rendered at ingest time; records built elsewhere fall back to escaped text.
+        if description_markup is None:
+            from html import escape
+            description_markup = escape(description or '', quote=False)
+        self.description_markup = description_markup
+        self.icon = icon
+        self.developer = developer
+        self.license = license
+        self.homepage = homepage
+        self.screenshots = screenshots
+        self.nix_package_attribute = nix_package_attribute
+        self.flatpak_ref = flatpak_ref
+        self.origin = origin
+        self.source_type = source_type
+        self.installed = bool(installed)
+
+    @classmethod
+    def from_row(cls, app_id, row):
+        (name, summary, description, description_markup, icon, developer, license, homepage, screenshots_json,
+         nix_package_attribute, flatpak_ref, origin, source_type, installed) = row
+        screenshots = tuple(json.loads(screenshots_json)) if screenshots_json else ()
+        return cls(app_id, name, summary, description, icon, developer, license, homepage,
+                   screenshots, nix_package_attribute, flatpak_ref, origin, source_type, description_markup, installed)
+
+    def __repr__(self):
+        return f"AppDetail({self.id!r}, {self.source_type!r})"
+
+
+class AppDetailCache:
+    def __init__(self, load, max_size=APP_DETAIL_CACHE_SIZE):
+        self.load = load
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._details = OrderedDict()
+        self._generation = 0
+
+    # Details are keyed per source: the same app ID can be in both catalogs.
+    def peek(self, app_id, source_type):
+        key = (source_type, app_id)
+        with self._lock:
+            detail = self._details.get(key)
+            if detail is not None:
+                self._details.move_to_end(key)
+            return detail
+
+    def get(self, app_id, source_type):
+        detail = self.peek(app_id, source_type)
+        if detail is not None:
+            return detail
+
+        generation = self._generation
+        detail = self.load(app_id, source_type)
+        if detail is None:
+            return None
+
+        key = (source_type, app_id)
+        with self._lock:
+            # A refresh that happened while loading makes this record stale, so it is not kept.
+            if generation == self._generation:
+                self._details[key] = detail
+                self._details.move_to_end(key)
+                while len(self._details) > self.max_size:
+                    self._details.popitem(last=False)
+        return detail
+
+    def invalidate(self):
+        with self._lock:
+            self._generation += 1
+            self._details.clear()
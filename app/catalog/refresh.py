@@ -0,0 +1,97 @@
+import os
+
+from tracing import traced
+
+from . import db, paths
+from .ingest import populate_db, populate_flatpak_apps
+from .installed import refresh_installed
+from .queries import ensure_featured_rotation
+from .schema import create_db
+
+
+CATALOG_SOURCES = (
+    ('local_appstream', paths.APPSTREAM_YAML_PATH, populate_db),
+    ('flatpak', paths.FLATPAK_APPSTREAM_PATH, populate_flatpak_apps),
+)
+
+
+def _source_fingerprint(path, previous=None):
+    st = os.stat(path)
+    if previous and previous[:3] == (path, st.st_size, st.st_mtime_ns):
+        return previous
+
+    import hashlib
+
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return (path, st.st_size, st.st_mtime_ns, digest.hexdigest())
+
+
+def refresh_catalog(conn, progress=None, source_refreshed=None):
+    c = conn.cursor()
+    recorded = {
+        row[0]: tuple(row[1:]) for row in c.execute(
+            'SELECT source_type, path, size, mtime_ns, sha256 FROM catalog_sources')
+    }
+
+    changed = []
+    for source_type, path, populate in CATALOG_SOURCES:
+        if _refresh_source(conn, source_type, path, populate, recorded.get(source_type), progress):
+            changed.append(source_type)
+        if source_refreshed:
+            source_refreshed(source_type, source_type in changed)
+
+    return changed
+
+
+def _refresh_source(conn, source_type, path, populate, previous, progress=None):
+    c = conn.cursor()
+    if not path or not os.path.isfile(path):
+        if not previous:
+            return False
+        with conn:
+            c.execute('DELETE FROM apps WHERE source_type = ?', (source_type,))
+            c.execute('DELETE FROM catalog_sources WHERE source_type = ?', (source_type,))
+        return True
+
+    fingerprint = _source_fingerprint(path, previous)
+    if fingerprint == previous:
+        return False
+
+    # A touched file with identical content only needs its stat data refreshed.
+    content_changed = not previous or previous[3] != fingerprint[3]
+    if content_changed:
+        populate(conn, (lambda count: progress(source_type, count)) if progress else None)
+
+    with conn:
+        c.execute('INSERT OR REPLACE INTO catalog_sources (source_type, path, size, mtime_ns, sha256) VALUES (?, ?, ?, ?, ?)',
+                  (source_type,) + fingerprint)
+    return content_changed
+
+
+@traced('db.prepare_catalog')
+def prepare_catalog(conn, progress=None, source_ready=None):
+    create_db(conn)
+    refresh_installed(conn)
+
+    # A changed source gets its rotation before it is shown, so the first finished source is
+    # browsable while the next one is still being indexed.
+    def on_source_refreshed(source_type, changed):
+        if changed:
+            ensure_featured_rotation(conn, catalog_changed=True)
+        if source_ready:
+            source_ready(source_type, changed)
+
+    changed = refresh_catalog(conn, progress, on_source_refreshed)
+    # The daily reshuffle of an unchanged catalog waits until everything is ready; until then
+    # yesterday's rotation is still valid, so a warm start doesn't wait for it.
+    ensure_featured_rotation(conn)
+    return changed
+
+
+@traced('db.ensure_db')
+def ensure_db():
+    db.ensure_setup(prepare_catalog)
+    return db.connection()
@@ -0,0 +1,132 @@
+SCHEMA_VERSION = 10
+
+APP_COLUMNS = (
+    'id', 'name', 'summary', 'description', 'description_markup', 'icon', 'developer', 'license', 'homepage',
+    'screenshots', 'category', 'keywords', 'nix_package_attribute', 'flatpak_ref', 'origin', 'source_type',
+    'content_hash'
+)
+
+# The same app ID can ship in both catalogs, so rows are keyed per source.
+APP_KEY_COLUMNS = ('source_type', 'id')
+
+# An upsert keeps the rowid stable, which the external-content FTS table relies on.
+APP_UPSERT_SQL = 'INSERT INTO apps ({}) VALUES ({}) ON CONFLICT({}) DO UPDATE SET {}'.format(
+    ', '.join(APP_COLUMNS), ', '.join('?' * len(APP_COLUMNS)), ', '.join(APP_KEY_COLUMNS),
+    ', '.join(f'{column} = excluded.{column}' for column in APP_COLUMNS if column not in APP_KEY_COLUMNS))
+
+CATEGORY_COLUMN = APP_COLUMNS.index('category')
+
+FTS_TEXT_COLUMNS = ('name', 'summary', 'description', 'developer', 'keywords')
+
+# source_type is indexed too, so a search filters by source inside the match itself.
+FTS_COLUMNS = FTS_TEXT_COLUMNS + ('source_type',)
+
+
+def create_db(conn):
+    c = conn.cursor()
+    if c.execute('PRAGMA user_version').fetchone()[0] != SCHEMA_VERSION:
+        c.execute('DROP TABLE IF EXISTS apps')
+        c.execute('DROP TABLE IF EXISTS catalog_sources')
+        c.execute('DROP TABLE IF EXISTS apps_fts')
+        c.execute('DROP TABLE IF EXISTS app_categories')
+        c.execute('DROP TABLE IF EXISTS featured_rotation')
+        c.execute('DROP TABLE IF EXISTS catalog_meta')
+        c.execute('DROP TABLE IF EXISTS installed_apps')
+        c.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS apps (
+            id TEXT NOT NULL,
+            name TEXT,
+            summary TEXT,
+            description TEXT,
+            description_markup TEXT,
+            icon TEXT,
+            developer TEXT,
+            license TEXT,
+            homepage TEXT,
+            screenshots TEXT,
+            category TEXT,
+            keywords TEXT,
+            nix_package_attribute TEXT NULL,
+            flatpak_ref TEXT NULL,
+            origin TEXT NULL,
+            source_type TEXT NOT NULL DEFAULT 'local_appstream',
+            content_hash TEXT NOT NULL,
+            PRIMARY KEY (source_type, id)
+        )
+    ''')
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS app_categories (
+            source_type TEXT NOT NULL,
+            app_id TEXT NOT NULL,
+            category TEXT NOT NULL COLLATE NOCASE,
+            PRIMARY KEY (source_type, app_id, category)
+        )
+    ''')
+    c.execute('CREATE INDEX IF NOT EXISTS app_categories_category ON app_categories (category, source_type, app_id)')
+    c.execute('''
+        CREATE TRIGGER IF NOT EXISTS app_categories_delete AFTER DELETE ON apps BEGIN
+            DELETE FROM app_categories WHERE source_type = old.source_type AND app_id = old.id;
+        END
+    ''')
+
+    fts_columns = ', '.join(FTS_COLUMNS)
+    new_values = ', '.join(f'new.{column}' for column in FTS_COLUMNS)
+    old_values = ', '.join(f'old.{column}' for column in FTS_COLUMNS)
+    c.execute(f'''
+        CREATE VIRTUAL TABLE IF NOT EXISTS apps_fts USING fts5 (
+            {fts_columns},
+            content='apps', content_rowid='rowid',
+            tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+        )
+    ''')
+    c.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS apps_fts_insert AFTER INSERT ON apps BEGIN
+            INSERT INTO apps_fts (rowid, {fts_columns}) VALUES (new.rowid, {new_values});
+        END
+    ''')
+    c.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS apps_fts_delete AFTER DELETE ON apps BEGIN
+            INSERT INTO apps_fts (apps_fts, rowid, {fts_columns}) VALUES ('delete', old.rowid, {old_values});
+        END
+    ''')
+    c.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS apps_fts_update AFTER UPDATE ON apps BEGIN
+            INSERT INTO apps_fts (apps_fts, rowid, {fts_columns}) VALUES ('delete', old.rowid, {old_values});
+            INSERT INTO apps_fts (rowid, {fts_columns}) VALUES (new.rowid, {new_values});
+        END
+    ''')
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS catalog_sources (
+            source_type TEXT PRIMARY KEY,
+            path TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            mtime_ns INTEGER NOT NULL,
+            sha256 TEXT NOT NULL
+        )
+    ''')
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS featured_rotation (
+            source TEXT NOT NULL,
+            category TEXT NOT NULL COLLATE NOCASE,
+            position INTEGER NOT NULL,
+            app_source_type TEXT NOT NULL,
+            app_id TEXT NOT NULL,
+            PRIMARY KEY (source, category, position)
+        ) WITHOUT ROWID
+    ''')
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS catalog_meta (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        )
+    ''')
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS installed_apps (
+            kind TEXT NOT NULL,
+            ref TEXT NOT NULL,
+            PRIMARY KEY (kind, ref)
+        ) WITHOUT ROWID
+    ''')
+    conn.commit()
@@ -1,43 +1,19 @@
-import os
 import sys
-import html
-import re
 import gi
 
 gi.require_version('Gtk', '4.0')
 gi.require_version('Adw', '1')
 
-from gi.repository import Gtk, Adw, Gio, GdkPixbuf, GLib
-from landing import GENERIC_ICON_NAMES
-
-APPSTREAM_YAML_PATH = os.environ.get("NIXOS_APPSTREAM_DATA")
-
-icons_base_dir = None
-if APPSTREAM_YAML_PATH and os.path.isfile(APPSTREAM_YAML_PATH):
-    share_app_info_dir = os.path.dirname(os.path.dirname(APPSTREAM_YAML_PATH))
-    icons_base_dir = os.path.join(share_app_info_dir, "icons", "nixos", "64x64")
-else:
-    icons_base_dir = None
-
-ICON_BASE_PATH = icons_base_dir
-
-
-def html_to_pango(text):
-    text = html.escape(text)
-
-    text = re.sub(r'&lt;p&gt;', '\n', text)
-    text = re.sub(r'&lt;/p&gt;', '\n', text)
-    text = re.sub(r'&lt;br\s*/?&gt;', '\n', text)
-    text = re.sub(r'&lt;/?ul&gt;', '', text)
-    text = re.sub(r'&lt;li&gt;', '• ', text)
-    text = re.sub(r'&lt;/li&gt;', '\n', text)
-
-    text = re.sub(r'\n\s*\n+', '\n\n', text)
-
-    return text.strip()
+from gi.repository import Gtk, Adw, Gio, GLib
+from catalog import nix_attribute_guess
+from icon_service import icon_service
+from install_queue import install_queue, NIX_USER, NIX_SYSTEM, FLATPAK, QUEUED, RUNNING, DONE, FAILED
+from tracing import traced
+from screenshots import ScreenshotFetchGroup, SCREENSHOT_HEIGHT
 
 
 class DetailPage(Gtk.ScrolledWindow):
+    @traced('ui.DetailPage')
     def __init__(self, app_info, parent_window=None):
         super().__init__()
         self.set_vexpand(True)
@@ -48,6 +24,10 @@ class DetailPage(Gtk.ScrolledWindow):
         self.set_margin_end(10)
 
         self.parent_window = parent_window
+        self.app_info = app_info
+        self.screenshot_fetches = ScreenshotFetchGroup()
+        self.install_method = "user"
+        self.install_job = None
 
         main_box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=20)
         main_box.set_margin_top(20)
@@ -70,40 +50,8 @@ class DetailPage(Gtk.ScrolledWindow):
         header_box.set_hexpand(True)
         main_box.append(header_box)
 
-        icon_path = None
-        if ICON_BASE_PATH:
-            candidate_name = app_info['icon']
-            if not candidate_name.lower().endswith('.png'):
-                candidate_name += ".png"
-            candidate = os.path.join(ICON_BASE_PATH, candidate_name)
-            if os.path.isfile(candidate):
-                icon_path = candidate
-
-        icon_image = None
-        placeholder_path = os.path.join(os.path.dirname(__file__), "..", "images", "placeholder.png")
-        placeholder_exists = os.path.exists(placeholder_path)
-        source_type = app_info.get('source_type', 'local_appstream')
-        icon_name = app_info['icon']
-
-        if icon_name in GENERIC_ICON_NAMES:
-            if placeholder_exists:
-                icon_image = Gtk.Image.new_from_file(placeholder_path)
-        else:
-            if source_type == 'flatpak':
-                flatpak_icon_path = os.path.join(os.path.expanduser('~'), '.local', 'share', 'flatpak', 'appstream', 'flathub', 'x86_64', 'active', 'icons', '128x128', f"{icon_name}.png")
-                if os.path.exists(flatpak_icon_path):
-                    icon_image = Gtk.Image.new_from_file(flatpak_icon_path)
-
-            if not icon_image and icon_path and os.path.exists(icon_path):
-                icon_image = Gtk.Image.new_from_file(icon_path)
-
-        if not icon_image:
-            if placeholder_exists:
-                icon_image = Gtk.Image.new_from_file(placeholder_path)
-            else:
-                icon_image = Gtk.Image.new_from_icon_name("image-missing")
-
-        icon_image.set_pixel_size(128)
+        source_type = app_info.source_type
+        icon_image = icon_service.image(app_info.icon, source_type, 128)
         icon_image.set_valign(Gtk.Align.CENTER)
         header_box.append(icon_image)
 
@@ -111,52 +59,47 @@ class DetailPage(Gtk.ScrolledWindow):
         info_box.set_vexpand(True)
         header_box.append(info_box)
 
-        name_label = Gtk.Label(label=f"{app_info['name']}")
+        name_label = Gtk.Label(label=f"{app_info.name}")
         name_label.set_halign(Gtk.Align.START)
         name_label.add_css_class("title-1")
         info_box.append(name_label)
 
-        summary_label = Gtk.Label(label=app_info['summary'])
+        summary_label = Gtk.Label(label=app_info.summary)
         summary_label.set_halign(Gtk.Align.START)
         summary_label.set_wrap(True)
         summary_label.get_style_context().add_class("dim-label")
         info_box.append(summary_label)
 
-        developer_label = Gtk.Label(label=f"Developer: {app_info['developer']}")
+        developer_label = Gtk.Label(label=f"Developer: {app_info.developer}")
         developer_label.set_halign(Gtk.Align.START)
         info_box.append(developer_label)
 
-        license_label = Gtk.Label(label=f"License: {app_info['license']}")
+        license_label = Gtk.Label(label=f"License: {app_info.license}")
         license_label.set_halign(Gtk.Align.START)
         info_box.append(license_label)
 
-        if app_info['homepage'] and app_info['homepage'] != 'N/A':
-            homepage_link = Gtk.LinkButton.new_with_label(app_info['homepage'], f"Homepage: {app_info['homepage']}")
+        if app_info.homepage and app_info.homepage != 'N/A':
+            homepage_link = Gtk.LinkButton.new_with_label(app_info.homepage, f"Homepage: {app_info.homepage}")
             homepage_link.set_halign(Gtk.Align.START)
             info_box.append(homepage_link)
 
+        self.install_status_label = Gtk.Label()
+        self.install_status_label.set_halign(Gtk.Align.START)
+        self.install_status_label.set_wrap(True)
+        self.install_status_label.set_max_width_chars(60)
+        self.install_status_label.add_css_class("dim-label")
+        self.install_status_label.set_visible(False)
+        info_box.append(self.install_status_label)
+
         install_box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=6)
         install_box.set_valign(Gtk.Align.START)
         install_box.set_halign(Gtk.Align.END)
         header_box.append(install_box)
 
-        source_type = app_info.get('source_type', 'local_appstream')
-
         def on_install_clicked(button):
-            install_id = None
-            method = ""
-
-            if source_type == 'flatpak':
-                install_id = app_info.get('flatpak_ref')
-                method = 'flatpak'
-            else:
-                install_id = app_info.get('nix_package_attribute')
-                method = f"nixpkgs ({self.install_method})"
-
+            kind, install_id, origin = self._install_target()
             if install_id:
-                print(f"Installing {install_id} ({method})")
-            
-            # TODO: Install logic
+                self._watch_install(install_queue.install(kind, install_id, origin))
 
         if source_type == 'flatpak':
             install_button = Gtk.Button(label="Install")
@@ -164,16 +107,17 @@ class DetailPage(Gtk.ScrolledWindow):
             install_button.set_size_request(120, 30)
             install_button.connect("clicked", on_install_clicked)
             install_box.append(install_button)
+            self.install_button = install_button
         else: # It's a nix package
             install_button = Gtk.Button(label="Install (User)")
             install_button.get_style_context().add_class("suggested-action")
             install_button.set_size_request(120, 30)
 
-            self.install_method = "user"
-            self.nix_package_attribute = app_info.get('nix_package_attribute', 'N/A')
+            self.nix_package_attribute = app_info.nix_package_attribute or 'N/A'
 
             install_button.connect("clicked", on_install_clicked)
             install_box.append(install_button)
+            self.install_button = install_button
 
             menu_button = Gtk.MenuButton()
             menu_button.set_tooltip_text("Choose installation method")
@@ -184,9 +128,8 @@ class DetailPage(Gtk.ScrolledWindow):
             menu_button.set_menu_model(menu)
 
             def on_menu_item_selected(action, param):
-                method = action.get_name().split('.')[-1]
-                self.install_method = method
-                install_button.set_label(f"Install ({method.capitalize()})")
+                self.install_method = action.get_name().split('.')[-1]
+                self._watch_install(install_queue.job_for(*self._install_target()[:2]))
 
             app = Gio.Application.get_default()
             if not app:
@@ -201,9 +144,10 @@ class DetailPage(Gtk.ScrolledWindow):
 
             install_box.append(menu_button)
 
-        description_content = app_info.get('description') or ""
-        desc_text = html_to_pango(description_content)
-        desc_label = Gtk.Label(label=desc_text)
+        # Reopening an app that is already queued or installing picks its progress back up.
+        self._watch_install(install_queue.job_for(*self._install_target()[:2]))
+
+        desc_label = Gtk.Label(label=app_info.description_markup)
         desc_label.set_use_markup(True)
         desc_label.set_halign(Gtk.Align.START)
         desc_label.set_wrap(True)
@@ -211,7 +155,7 @@ class DetailPage(Gtk.ScrolledWindow):
         desc_label.set_justify(Gtk.Justification.LEFT)
         main_box.append(desc_label)
 
-        if app_info['screenshots']:
+        if app_info.screenshots:
             screenshots_title = Gtk.Label(label="Screenshots")
             screenshots_title.set_halign(Gtk.Align.START)
             screenshots_title.add_css_class("title-2")
@@ -219,7 +163,7 @@ class DetailPage(Gtk.ScrolledWindow):
 
             screenshots_scrolled_window = Gtk.ScrolledWindow()
             screenshots_scrolled_window.set_policy(Gtk.PolicyType.AUTOMATIC, Gtk.PolicyType.NEVER)
-            screenshots_scrolled_window.set_size_request(-1, 1200)
+            screenshots_scrolled_window.set_size_request(-1, SCREENSHOT_HEIGHT + 24)
             main_box.append(screenshots_scrolled_window)
 
             screenshots_flowbox = Gtk.FlowBox()
@@ -228,43 +172,87 @@ class DetailPage(Gtk.ScrolledWindow):
             screenshots_flowbox.set_selection_mode(Gtk.SelectionMode.NONE)
             screenshots_scrolled_window.set_child(screenshots_flowbox)
 
-            for shot_url in app_info['screenshots']:
-                img = Gtk.Image()
-
-                def on_download_complete(source, result, img_to_update=img):
-                    stream = Gio.File.read_finish(source, result)
-                    if not stream:
-                        return
-
-                    pixbuf_loader = GdkPixbuf.PixbufLoader.new()
+            for shot_url in app_info.screenshots:
+                picture = Gtk.Picture()
+                picture.set_can_shrink(False)
 
-                    data = stream.read_bytes(4096, None)
-                    while data.get_size() > 0:
-                        pixbuf_loader.write(data.get_data())
-                        data = stream.read_bytes(4096, None)
+                def on_screenshot_loaded(texture, picture_to_update=picture):
+                    picture_to_update.set_paintable(texture)
+                    picture_to_update.set_size_request(texture.get_width(), texture.get_height())
 
-                    pixbuf_loader.close()
+                self.screenshot_fetches.fetch(shot_url, on_screenshot_loaded)
 
-                    pixbuf = pixbuf_loader.get_pixbuf()
-                    if pixbuf:
-                        width = pixbuf.get_width()
-                        height = pixbuf.get_height()
+                screenshots_flowbox.append(picture)
 
-                        fixed_width = 800
-                        fixed_height = 450
+    def cancel_pending_loads(self):
+        self.screenshot_fetches.cancel()
+        if self.install_job is not None:
+            self.install_job.remove_listener(self._on_install_update)
 
-                        scaled_pixbuf = pixbuf.scale_simple(fixed_width, fixed_height,
-                                                                GdkPixbuf.InterpType.BILINEAR)
-                        img_to_update.set_from_pixbuf(scaled_pixbuf)
-                        img_to_update.set_size_request(fixed_width, fixed_height)
-
-                    stream.close()
-
-                cancellable = Gio.Cancellable.new()
-                file = Gio.File.new_for_uri(shot_url)
-                file.read_async(GLib.PRIORITY_DEFAULT, cancellable, on_download_complete, img)
-
-                screenshots_flowbox.append(img)
+    def _install_target(self):
+        if self.app_info.source_type == 'flatpak':
+            return FLATPAK, self.app_info.flatpak_ref, self.app_info.origin
+        install_id = self.app_info.nix_package_attribute
+        if install_id == 'N/A':
+            install_id = None
+        return (NIX_SYSTEM if self.install_method == "system" else NIX_USER), install_id, None
+
+    def _installed_unknown(self):
+        # Without a package name in the catalog the attribute is a guess from the desktop ID,
+        # which rarely matches what the nix profile records, so "not installed" proves nothing.
+        app_info = self.app_info
+        return (app_info.source_type == 'local_appstream' and not app_info.installed
+                and app_info.nix_package_attribute == nix_attribute_guess(app_info.id))
+
+    def _install_label(self):
+        if self.app_info.source_type == 'flatpak':
+            return "Install"
+        return f"Install ({self.install_method.capitalize()})"
+
+    def _watch_install(self, job):
+        if self.install_job is not None:
+            self.install_job.remove_listener(self._on_install_update)
+        self.install_job = job
+        if job is not None:
+            job.add_listener(self._on_install_update)
+        self._show_install_state(job)
+
+    def _on_install_update(self, job):
+        GLib.idle_add(self._show_install_state, job)
+
+    def _show_install_state(self, job):
+        if job is not self.install_job:
+            return GLib.SOURCE_REMOVE
+
+        state = job.state if job is not None else None
+        if state is None and self.app_info.installed:
+            self.install_button.set_label("Installed")
+            self.install_button.set_sensitive(False)
+            self.install_status_label.set_visible(False)
+            return GLib.SOURCE_REMOVE
+
+        if state == QUEUED:
+            self.install_button.set_label("Queued…")
+        elif state == RUNNING:
+            self.install_button.set_label("Installing…")
+        elif state == DONE:
+            self.install_button.set_label("Installed")
+        else:
+            self.install_button.set_label(self._install_label())
+        self.install_button.set_sensitive(state in (None, FAILED) and self._install_target()[1] is not None)
+
+        if state in (QUEUED, RUNNING):
+            self.install_status_label.set_label(job.message or "Waiting for other installs…")
+        elif state == FAILED:
+            self.install_status_label.set_label(f"Install failed: {job.message}")
+        elif state is None and self._installed_unknown():
+            self.install_status_label.set_label(
+                "Can't tell whether this is installed: the catalog doesn't name its Nix package.")
+        else:
+            self.install_status_label.set_visible(False)
+            return GLib.SOURCE_REMOVE
+        self.install_status_label.set_visible(True)
+        return GLib.SOURCE_REMOVE
 
     def on_back_clicked(self, button):
         if self.parent_window:
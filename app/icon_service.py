@@ -0,0 +1,135 @@
+import os
+import threading
+from collections import OrderedDict
+
+import gi
+
+gi.require_version('Gtk', '4.0')
+gi.require_version('Adw', '1')
+
+from gi.repository import Gtk, Gdk, GLib
+
+from catalog.paths import NIXOS_ICONS_DIR, FLATPAK_ICONS_PATH, PLACEHOLDER_PATH
+from tracing import traced
+
+GENERIC_ICON_NAMES = [
+    "application-x-executable",
+    "image-missing",
+    "utilities-terminal",
+    "text-x-generic"
+]
+
+ICON_SIZES = (64, 128)
+
+TEXTURE_CACHE_SIZE = 512
+
+
+def _scan_icon_dir(path):
+    index = {}
+    try:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                if entry.name.endswith('.png'):
+                    index[entry.name] = entry.path
+                    index.setdefault(entry.name[:-len('.png')], entry.path)
+    except OSError:
+        pass
+    return index
+
+
+class IconService:
+    def __init__(self, nixos_icons_dir=NIXOS_ICONS_DIR, flatpak_icons_dir=FLATPAK_ICONS_PATH,
+                 placeholder_path=PLACEHOLDER_PATH, cache_size=TEXTURE_CACHE_SIZE):
+        self.nixos_icons_dir = nixos_icons_dir
+        self.flatpak_icons_dir = flatpak_icons_dir
+        self.placeholder_path = placeholder_path
+        self.cache_size = cache_size
+        self._lock = threading.Lock()
+        self._index = None
+        self._textures = OrderedDict()
+        self._placeholder = None
+        self._placeholder_loaded = False
+
+    def _build_index(self):
+        index = {}
+        for size in ICON_SIZES:
+            if self.nixos_icons_dir:
+                index[('nixos', size)] = _scan_icon_dir(os.path.join(self.nixos_icons_dir, f"{size}x{size}"))
+            index[('flatpak', size)] = _scan_icon_dir(os.path.join(self.flatpak_icons_dir, f"{size}x{size}"))
+        return index
+
+    def rescan(self):
+        with self._lock:
+            self._index = None
+            self._textures.clear()
+
+    def resolve_path(self, icon_name, source_type, size=64):
+        if not icon_name or icon_name in GENERIC_ICON_NAMES:
+            return None
+
+        with self._lock:
+            if self._index is None:
+                self._index = self._build_index()
+            index = self._index
+
+        # Flatpak icons come from the Flathub appstream tree first, everything falls
+        # back to the NixOS icon set; the 64px set covers sizes that were not shipped.
+        lookups = []
+        if source_type == 'flatpak':
+            lookups.append(('flatpak', size))
+        lookups.append(('nixos', size))
+        if size != 64:
+            if source_type == 'flatpak':
+                lookups.append(('flatpak', 64))
+            lookups.append(('nixos', 64))
+
+        for key in lookups:
+            path = index.get(key, {}).get(icon_name)
+            if path:
+                return path
+        return None
+
+    def placeholder_texture(self):
+        if not self._placeholder_loaded:
+            self._placeholder = self._load_texture(self.placeholder_path)
+            self._placeholder_loaded = True
+        return self._placeholder
+
+    @traced('icons.load_texture')
+    def _load_texture(self, path):
+        try:
+            return Gdk.Texture.new_from_filename(path)
+        except GLib.Error:
+            return None
+
+    def texture(self, icon_name, source_type, size=64):
+        key = (icon_name, source_type == 'flatpak', size)
+        with self._lock:
+            texture = self._textures.get(key)
+            if texture is not None:
+                self._textures.move_to_end(key)
+                return texture
+
+        path = self.resolve_path(icon_name, source_type, size)
+        texture = self._load_texture(path) if path else None
+        if texture is None:
+            return self.placeholder_texture()
+
+        with self._lock:
+            self._textures[key] = texture
+            self._textures.move_to_end(key)
+            while len(self._textures) > self.cache_size:
+                self._textures.popitem(last=False)
+        return texture
+
+    def image(self, icon_name, source_type, size=64):
+        texture = self.texture(icon_name, source_type, size)
+        if texture is not None:
+            image = Gtk.Image.new_from_paintable(texture)
+        else:
+            image = Gtk.Image.new_from_icon_name("image-missing")
+        image.set_pixel_size(size)
+        return image
+
+
+icon_service = IconService()
@@ -0,0 +1,161 @@
+import subprocess
+import threading
+import time
+
+NIX_COMMAND = 'nix'
+
+FLATPAK_COMMAND = 'flatpak'
+
+# Clicks this close together go out as one transaction.
+INSTALL_BATCH_DELAY = 0.5
+
+NIX_USER = 'nix-user'
+NIX_SYSTEM = 'nix-system'
+FLATPAK = 'flatpak'
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+
+class InstallJob:
+    __slots__ = ('kind', 'install_id', 'origin', 'state', 'message', '_listeners', '_lock')
+
+    def __init__(self, kind, install_id, origin=None):
+        self.kind = kind
+        self.install_id = install_id
+        self.origin = origin
+        self.state = QUEUED
+        self.message = ''
+        self._listeners = []
+        self._lock = threading.Lock()
+
+    @property
+    def finished(self):
+        return self.state in (DONE, FAILED)
+
+    def add_listener(self, listener):
+        with self._lock:
+            self._listeners.append(listener)
+
+    def remove_listener(self, listener):
+        with self._lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+    def update(self, state=None, message=None):
+        if state is not None:
+            self.state = state
+        if message is not None:
+            self.message = message
+        with self._lock:
+            listeners = list(self._listeners)
+        # Listeners run on the install worker; UI code hops back to the main loop itself.
+        for listener in listeners:
+            listener(self)
+
+    def __repr__(self):
+        return f"InstallJob({self.kind!r}, {self.install_id!r}, {self.state!r})"
+
+
+class InstallQueue:
+    def __init__(self, nix_command=NIX_COMMAND, flatpak_command=FLATPAK_COMMAND, batch_delay=INSTALL_BATCH_DELAY):
+        self.nix_command = nix_command
+        self.flatpak_command = flatpak_command
+        self.batch_delay = batch_delay
+        self._condition = threading.Condition()
+        self._pending = []
+        self._jobs = {}
+        self._worker = None
+
+    def install(self, kind, install_id, origin=None):
+        with self._condition:
+            job = self._jobs.get((kind, install_id))
+            if job is not None and job.state != FAILED:
+                return job
+
+            job = InstallJob(kind, install_id, origin)
+            self._jobs[(kind, install_id)] = job
+            self._pending.append(job)
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run_worker, name='install', daemon=True)
+                self._worker.start()
+            self._condition.notify()
+            return job
+
+    def job_for(self, kind, install_id):
+        with self._condition:
+            return self._jobs.get((kind, install_id))
+
+    def _run_worker(self):
+        while True:
+            with self._condition:
+                while not self._pending:
+                    self._condition.wait()
+
+            # Give follow-up clicks a moment to join this batch.
+            time.sleep(self.batch_delay)
+
+            with self._condition:
+                jobs = self._pending
+                self._pending = []
+
+            batches = {}
+            for job in jobs:
+                batches.setdefault((job.kind, job.origin), []).append(job)
+            for (kind, origin), batch in batches.items():
+                self._run_batch(kind, origin, batch)
+
+    def _run_batch(self, kind, origin, jobs):
+        command = self._command(kind, origin, jobs)
+        if command is None:
+            for job in jobs:
+                job.update(FAILED, "System-wide installs are not supported yet; use a user install.")
+            return
+
+        for job in jobs:
+            job.update(RUNNING, "Starting…")
+
+        returncode, last_line = self._run_command(command, jobs)
+        if returncode == 0:
+            for job in jobs:
+                job.update(DONE, "Installed")
+            return
+
+        # One bad package fails the whole transaction, so the rest are retried on their own.
+        if len(jobs) > 1:
+            for job in jobs:
+                self._run_batch(kind, origin, [job])
+            return
+
+        jobs[0].update(FAILED, last_line or f"{command[0]} exited with status {returncode}")
+
+    def _command(self, kind, origin, jobs):
+        install_ids = [job.install_id for job in jobs]
+        if kind == NIX_USER:
+            return [self.nix_command, 'profile', 'install'] + [f"nixpkgs#{install_id}" for install_id in install_ids]
+        if kind == FLATPAK:
+            return [self.flatpak_command, 'install', '--user', '--noninteractive', '-y', origin or 'flathub'] + install_ids
+        return None
+
+    def _run_command(self, command, jobs):
+        try:
+            process = subprocess.Popen(
+                command, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                text=True, errors='replace')
+        except OSError as e:
+            return -1, str(e)
+
+        # Universal newlines turn carriage-return progress bars into separate lines as well.
+        last_line = ''
+        for line in process.stdout:
+            line = line.strip()
+            if line:
+                last_line = line
+                for job in jobs:
+                    job.update(message=line)
+        return process.wait(), last_line
+
+
+install_queue = InstallQueue()
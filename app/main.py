@@ -4,50 +4,28 @@ import os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 import gi
-import json
 import threading
+import traceback
 
 gi.require_version('Gtk', '4.0')
 gi.require_version('Adw', '1')
 
-from gi.repository import Gtk, Adw, Pango, GLib
+from gi.repository import Gtk, Adw, Pango, GLib, Gio
 
-from landing import create_landing, ensure_db, get_apps_by_category, search_local_apps, search_nixpkgs_apps
+import catalog
+from catalog import AppDetail, prepare_catalog, get_apps_by_category, search_local_apps, app_details, SOURCE_CATALOGS
+from landing import create_landing, LandingViewCache
+from nix_search import search_nixpkgs_apps
 from detail_page import DetailPage
-from search_page import SearchPage
-
-APPSTREAM_YAML_PATH = os.environ.get("NIXOS_APPSTREAM_DATA")
-DB_PATH = os.path.expanduser('~/.cache/alloy_store_apps.db')
-
-
-def get_app_details_from_db(app_id):
-    conn = ensure_db()
-    c = conn.cursor()
-    c.execute(
-        'SELECT name, summary, description, icon, developer, license, homepage, screenshots, nix_package_attribute, flatpak_ref, origin, source_type '
-        'FROM apps WHERE id = ?',
-        (app_id,)
-    )
-    row = c.fetchone()
-    conn.close()
-    if row:
-        name, summary, description, icon, developer, license, homepage, screenshots_json, nix_package_attribute, flatpak_ref, origin, source_type = row
-        screenshots = json.loads(screenshots_json) if screenshots_json else []
-        return {
-            'name': name,
-            'summary': summary,
-            'description': description,
-            'icon': icon,
-            'developer': developer,
-            'license': license,
-            'homepage': homepage,
-            'screenshots': screenshots,
-            'nix_package_attribute': nix_package_attribute,
-            'flatpak_ref': flatpak_ref,
-            'origin': origin,
-            'source_type': source_type
-        }
-    return None
+from search_page import SearchPage, SEARCH_PAGE_SIZE
+from progress_page import IndexingPage
+from search_scheduler import SearchScheduler
+from prefetch import DetailPrefetcher
+from icon_service import icon_service
+from tracing import traced
+
+# nix profile and flatpak touch several files per transaction; this waits for them to settle.
+INSTALLED_REFRESH_DELAY_MS = 500
 
 
 class MainWindow(Gtk.ApplicationWindow):
@@ -80,17 +58,21 @@ class MainWindow(Gtk.ApplicationWindow):
         self.main_box.append(self.content_box)
 
         self.detail_page = None
-        self.category_cache = {}
+        self.landing_cache = LandingViewCache()
+        self.prefetcher = DetailPrefetcher(app_details)
+        self.installed_monitors = []
+        self.installed_refresh_source = None
         self.current_view = None
         self.previous_view = None
 
         self.current_category = "Featured"
         self.current_source = "nixpkgs"
-        conn = ensure_db()
-        initial_apps = get_apps_by_category(conn, self.current_category, 18, self.current_source)
-        self.category_cache[self.current_category] = initial_apps
-        self.current_view = create_landing(self.content_box, self, category=self.current_category, apps=initial_apps)
+        self.ready_catalogs = set()
+        self.search_scheduler = SearchScheduler(self.run_search, self.update_search_results_ui)
+        self.indexing_page = IndexingPage()
+        self.current_view = self.indexing_page
         self.content_box.append(self.current_view)
+        self.start_catalog_indexing()
 
         self.header = Gtk.HeaderBar()
         self.header.set_show_title_buttons(True)
@@ -125,9 +107,112 @@ class MainWindow(Gtk.ApplicationWindow):
         self.source_dropdown.set_selected(0)
         self.current_source = "nixpkgs"
 
+    def start_catalog_indexing(self):
+        def on_progress(source_type, count):
+            GLib.idle_add(self.on_catalog_progress, source_type, count)
+
+        def on_source_ready(source_type, changed):
+            GLib.idle_add(self.on_catalog_source_ready, source_type, changed)
+
+        def run_indexing_in_background():
+            try:
+                catalog.ensure_setup(lambda conn: prepare_catalog(conn, on_progress, on_source_ready))
+                # Typo fallback for search; headless callers build it on first use instead.
+                catalog.trigram_index.build(catalog.connection())
+            except Exception as e:
+                # Sources that finished before the failure stay usable; the rest show the error.
+                traceback.print_exc()
+                GLib.idle_add(self.on_catalog_failed, str(e) or type(e).__name__)
+            else:
+                GLib.idle_add(self.on_catalog_ready)
+
+        indexing_thread = threading.Thread(target=run_indexing_in_background, daemon=True)
+        indexing_thread.start()
+
+    def is_source_ready(self, source=None):
+        return SOURCE_CATALOGS.get(source or self.current_source) in self.ready_catalogs
+
+    def on_catalog_progress(self, source_type, count):
+        if self.indexing_page:
+            self.indexing_page.update_source(source_type, count)
+        return GLib.SOURCE_REMOVE
+
+    def on_catalog_source_ready(self, source_type, changed):
+        self.ready_catalogs.add(source_type)
+        if changed:
+            # An updated catalog ships its own icon set; names seen before may now resolve.
+            icon_service.rescan()
+        self.landing_cache.invalidate()
+        self.prefetcher.invalidate()
+        app_details.invalidate()
+        if self.indexing_page:
+            self.indexing_page.mark_source_ready(source_type)
+            if self.current_view is self.indexing_page and self.is_source_ready():
+                self.show_category_view()
+        return GLib.SOURCE_REMOVE
+
+    def on_catalog_ready(self):
+        self.ready_catalogs.update(SOURCE_CATALOGS.values())
+        # The day's rotation may have landed after the sources were first shown.
+        self.landing_cache.invalidate()
+        if self.current_view is self.indexing_page:
+            self.show_category_view()
+        self.indexing_page = None
+        self.watch_installed_apps()
+        return GLib.SOURCE_REMOVE
+
+    def on_catalog_failed(self, message):
+        if self.indexing_page:
+            self.indexing_page.show_error(message)
+        return GLib.SOURCE_REMOVE
+
+    def watch_installed_apps(self):
+        for path in catalog.installed_watch_paths():
+            monitor = Gio.File.new_for_path(path).monitor_directory(Gio.FileMonitorFlags.NONE, None)
+            monitor.connect("changed", self.on_installed_apps_changed)
+            self.installed_monitors.append(monitor)
+
+    def on_installed_apps_changed(self, *args):
+        if self.installed_refresh_source is None:
+            self.installed_refresh_source = GLib.timeout_add(INSTALLED_REFRESH_DELAY_MS, self.refresh_installed_apps)
+
+    def refresh_installed_apps(self):
+        self.installed_refresh_source = None
+
+        def refresh_in_background():
+            if catalog.refresh_installed(catalog.connection()):
+                GLib.idle_add(self.on_installed_apps_refreshed)
+
+        threading.Thread(target=refresh_in_background, daemon=True).start()
+        return GLib.SOURCE_REMOVE
+
+    def on_installed_apps_refreshed(self):
+        self.landing_cache.invalidate()
+        self.prefetcher.invalidate()
+        app_details.invalidate()
+        return GLib.SOURCE_REMOVE
+
+    @traced('ui.show_category_view')
+    def show_category_view(self):
+        self.search_scheduler.cancel()
+        self._clear_content_views()
+
+        if not self.is_source_ready():
+            self.current_view = self.indexing_page
+        else:
+            self.current_view = self.landing_cache.get(self.current_category, self.current_source)
+            if self.current_view is None:
+                conn = catalog.connection()
+                apps = get_apps_by_category(conn, self.current_category, 18, self.current_source)
+                self.current_view = create_landing(self.content_box, self, category=self.current_category, apps=apps)
+                self.landing_cache.put(self.current_category, self.current_source, self.current_view)
+        self.content_box.append(self.current_view)
+
     def _clear_content_views(self):
-        if self.detail_page and self.detail_page.get_parent():
-            self.content_box.remove(self.detail_page)
+        if self.detail_page:
+            self.detail_page.cancel_pending_loads()
+            if self.detail_page.get_parent():
+                self.content_box.remove(self.detail_page)
             self.detail_page = None
         if self.current_view and self.current_view.get_parent():
             self.content_box.remove(self.current_view)
@@ -148,9 +233,7 @@ class MainWindow(Gtk.ApplicationWindow):
 
         self._clear_content_views()
 
-        conn = ensure_db()
-        if query:
-            self._clear_content_views()
+        if query and self.is_source_ready():
             loading_label = Gtk.Label(label="Searching... Please wait.")
             loading_label.add_css_class("title-2")
             loading_label.set_halign(Gtk.Align.CENTER)
@@ -159,49 +242,46 @@ class MainWindow(Gtk.ApplicationWindow):
             loading_label.show()
             self.current_view = loading_label
 
-            def run_search_in_background():
-                thread_conn = ensure_db()
-                local_apps = search_local_apps(thread_conn, query, 25, self.current_source)
-                
-                nixpkgs_apps = []
-                if self.current_source == "nixpkgs":
-                    nixpkgs_apps = search_nixpkgs_apps(query, 25)
-
-                combined_apps = []
-                for app_data in local_apps:
-                    combined_apps.append({
-                        'id': app_data[0],
-                        'name': app_data[1],
-                        'summary': app_data[2],
-                        'icon': app_data[3],
-                        'nix_package_attribute': app_data[4],
-                        'source_type': app_data[5]
-                    })
-                
-                if self.current_source == "nixpkgs":
-                    combined_apps.extend(nixpkgs_apps)
-
-                GLib.idle_add(self.update_search_results_ui, combined_apps)
-
-            search_thread = threading.Thread(target=run_search_in_background)
-            search_thread.start()
-
+            self.search_scheduler.schedule(query, self.current_source)
         else:
-            if self.current_category in self.category_cache:
-                apps = self.category_cache[self.current_category]
-            else:
-                apps = get_apps_by_category(conn, self.current_category, 18, self.current_source)
-                self.category_cache[self.current_category] = apps
-            self.current_view = create_landing(self.content_box, self, category=self.current_category, apps=apps)
-            self.content_box.append(self.current_view)
+            self.show_category_view()
+
+    def fetch_local_results(self, query, source, offset, limit):
+        return search_local_apps(catalog.connection(), query, limit, source, offset)
+
+    def run_search(self, job):
+        return self.fetch_local_results(job.query, job.source, 0, SEARCH_PAGE_SIZE)
+
+    def update_search_results_ui(self, job, local_apps):
+        def fetch_page(offset, limit, on_loaded):
+            self.search_scheduler.fetch_page(
+                lambda: self.fetch_local_results(job.query, job.source, offset, limit), on_loaded)
 
-    def update_search_results_ui(self, combined_apps):
+        if job.source == "nixpkgs":
+            def on_nixpkgs_results(nixpkgs_apps):
+                if not self.search_scheduler.is_current(job):
+                    return
+                if isinstance(self.current_view, SearchPage):
+                    self.current_view.append_results(nixpkgs_apps)
+                else:
+                    self.show_search_results(nixpkgs_apps)
+
+            search_nixpkgs_apps(job.query, 25, on_nixpkgs_results, job.cancellable)
+
+            # Keep the loading label up until nix answers if there is nothing local to show.
+            if not local_apps:
+                return
+
+        self.show_search_results(local_apps, fetch_page)
+
+    def show_search_results(self, apps, fetch_page=None):
         self._clear_content_views()
+        # Screenshots warmed for the previous results are not worth downloading anymore.
+        self.prefetcher.invalidate()
 
-        self.current_view = SearchPage(combined_apps, self)
+        self.current_view = SearchPage(apps, self, fetch_page)
         self.content_box.append(self.current_view)
         self.current_view.show()
-        return GLib.SOURCE_REMOVE
 
     def on_source_selected(self, dropdown, pspec):
         selected_item = dropdown.get_selected_item()
@@ -211,9 +291,6 @@ class MainWindow(Gtk.ApplicationWindow):
                 self.current_source = "nixpkgs"
             elif selected_source_text == "Flatpak":
                 self.current_source = "flatpak"
-            
-            if self.current_category in self.category_cache:
-                del self.category_cache[self.current_category]
 
             active_category_button = None
             for btn in self.category_buttons:
@@ -275,39 +352,38 @@ class MainWindow(Gtk.ApplicationWindow):
                 if btn is not toggled_btn:
                     btn.set_active(False)
 
-            category = toggled_btn.get_label()
-            self.current_category = category
+            self.current_category = toggled_btn.get_label()
+            self.show_category_view()
 
-            self._clear_content_views()
-
-            conn = ensure_db()
-            apps = get_apps_by_category(conn, category, 18, self.current_source)
-            self.category_cache[category] = apps
-
-            self.current_view = create_landing(self.content_box, self, category=self.current_category, apps=apps)
-            self.content_box.append(self.current_view)
+    def prefetch_detail(self, app_id, source_type, screenshot=False):
+        self.prefetcher.prefetch(app_id, source_type, screenshot)
 
+    @traced('ui.show_detail')
     def show_detail(self, app_id, source_type='local_appstream'):
         app_info = None
         if source_type == 'local_appstream' or source_type == 'flatpak':
-            app_info = get_app_details_from_db(app_id)
+            app_info = app_details.get(app_id, source_type)
         elif source_type == 'nixpkgs_search':
             package_name = app_id.split('.')[-1]
-            app_info = {
-                'name': package_name,
-                'summary': f"No summary found for {package_name}'.",
-                'description': f"No description found for {package_name}'.",
-                'icon': 'application-x-executable',
-                'developer': 'None',
-                'license': 'N/A',
-                'homepage': 'No home page found.',
-                'screenshots': [],
-                'nix_package_attribute': package_name
-            }
+            app_info = AppDetail(
+                app_id,
+                name=package_name,
+                summary=f"No summary found for {package_name}'.",
+                description=f"No description found for {package_name}'.",
+                icon='application-x-executable',
+                developer='None',
+                license='N/A',
+                homepage='No home page found.',
+                screenshots=(),
+                nix_package_attribute=package_name,
+                source_type='nixpkgs_search'
+            )
 
         if not app_info:
             return
 
+        self.search_scheduler.cancel()
+
         if hasattr(self, 'current_view') and self.current_view:
             self.previous_view = self.current_view
 
@@ -330,10 +406,7 @@ class MainWindow(Gtk.ApplicationWindow):
             self.content_box.append(self.current_view)
             self.previous_view = None
         else:
-            conn = ensure_db()
-            apps = get_apps_by_category(conn, self.current_category, 18, self.current_source)
-            self.current_view = create_landing(self.content_box, self, category=self.current_category, apps=apps)
-            self.content_box.append(self.current_view)
+            self.show_category_view()
 
 
 class App(Adw.Application):
@@ -0,0 +1,158 @@
+import codecs
+import json
+
+from gi.repository import Gio, GLib
+
+import tracing
+from catalog import AppCard
+
+NIX_SEARCH_TIMEOUT_MS = 60000
+NIX_SEARCH_READ_SIZE = 16384
+
+_WHITESPACE = ' \t\n\r'
+
+
+def nix_search_result(attr_path, details):
+    package_name = attr_path.split('.')[-1]
+    description = details.get('description', 'No description available.')
+    version = details.get('version', '')
+
+    return AppCard(attr_path, f"{package_name} ({version})", description, 'application-x-executable',
+                   'nixpkgs_search', package_name)
+
+
+class NixSearchOutputParser:
+    # `nix search --json` prints one object keyed by attribute path; entries are
+    # handed out as soon as each one is complete instead of after the whole document.
+    def __init__(self):
+        self._decoder = json.JSONDecoder()
+        self._buffer = ''
+        self._opened = False
+        self.finished = False
+
+    def _skip(self, position, characters=_WHITESPACE):
+        while position < len(self._buffer) and self._buffer[position] in characters:
+            position += 1
+        return position
+
+    def feed(self, text):
+        self._buffer += text
+        entries = []
+        position = 0
+
+        while not self.finished:
+            position = self._skip(position)
+            if position >= len(self._buffer):
+                break
+
+            if not self._opened:
+                if self._buffer[position] != '{':
+                    self.finished = True
+                    break
+                self._opened = True
+                position += 1
+                continue
+
+            position = self._skip(position, _WHITESPACE + ',')
+            if position >= len(self._buffer):
+                break
+            if self._buffer[position] == '}':
+                self.finished = True
+                break
+
+            try:
+                key, key_end = self._decoder.raw_decode(self._buffer, position)
+                colon = self._skip(key_end)
+                if colon >= len(self._buffer) or self._buffer[colon] != ':':
+                    break
+                value, value_end = self._decoder.raw_decode(self._buffer, self._skip(colon + 1))
+            except json.JSONDecodeError:
+                break
+
+            if isinstance(value, dict):
+                entries.append((key, value))
+            position = value_end
+
+        self._buffer = self._buffer[position:]
+        return entries
+
+
+class NixSearch:
+    def __init__(self, query, limit, on_done, cancellable=None, timeout_ms=NIX_SEARCH_TIMEOUT_MS):
+        self.query = query
+        self.limit = limit
+        self.on_done = on_done
+        self.cancellable = cancellable or Gio.Cancellable()
+        self.timeout_ms = timeout_ms
+        self.results = []
+        self._parser = NixSearchOutputParser()
+        self._text_decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        self._process = None
+        self._timeout_id = None
+        self._finished = False
+        self._span = tracing.NULL_SPAN
+
+    def start(self):
+        self._span = tracing.span('search.nixpkgs', query=self.query)
+        command = ["nix", "search", "--json", "nixpkgs", self.query]
+        try:
+            self._process = Gio.Subprocess.new(
+                command, Gio.SubprocessFlags.STDOUT_PIPE | Gio.SubprocessFlags.STDERR_SILENCE)
+        except GLib.Error:
+            GLib.idle_add(self._finish)
+            return self
+
+        self._timeout_id = GLib.timeout_add(self.timeout_ms, self._on_timeout)
+        self._read_next()
+        return self
+
+    def _read_next(self):
+        stream = self._process.get_stdout_pipe()
+        stream.read_bytes_async(NIX_SEARCH_READ_SIZE, GLib.PRIORITY_DEFAULT, self.cancellable, self._on_read)
+
+    def _on_read(self, stream, result):
+        try:
+            data = stream.read_bytes_finish(result)
+        except GLib.Error:
+            self._finish()
+            return
+
+        if data.get_size() == 0:
+            self._finish()
+            return
+
+        text = self._text_decoder.decode(data.get_data())
+        for attr_path, details in self._parser.feed(text):
+            self.results.append(nix_search_result(attr_path, details))
+            if len(self.results) >= self.limit:
+                break
+
+        # Enough results (or the end of the document) means nix can stop evaluating.
+        if len(self.results) >= self.limit or self._parser.finished:
+            self._finish()
+        else:
+            self._read_next()
+
+    def _on_timeout(self):
+        self._timeout_id = None
+        self._finish()
+        return GLib.SOURCE_REMOVE
+
+    def _finish(self):
+        if self._finished:
+            return GLib.SOURCE_REMOVE
+        self._finished = True
+
+        if self._timeout_id:
+            GLib.source_remove(self._timeout_id)
+            self._timeout_id = None
+        if self._process:
+            self._process.force_exit()
+        self._span.end(results=len(self.results), cancelled=self.cancellable.is_cancelled())
+        if not self.cancellable.is_cancelled():
+            self.on_done(self.results[:self.limit])
+        return GLib.SOURCE_REMOVE
+
+
+def search_nixpkgs_apps(query, limit, on_done, cancellable=None, timeout_ms=NIX_SEARCH_TIMEOUT_MS):
+    return NixSearch(query, limit, on_done, cancellable, timeout_ms).start()
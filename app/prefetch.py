@@ -0,0 +1,91 @@
+import threading
+from collections import deque
+
+from gi.repository import Gio
+
+from icon_service import icon_service
+from screenshots import screenshot_fetcher, FETCH_PREFETCH
+
+# Only the most recent requests matter; older ones fall off when the user scrolls past them.
+PREFETCH_QUEUE_SIZE = 24
+
+PREFETCH_WORKERS = 2
+
+PREFETCHABLE_SOURCE_TYPES = ('local_appstream', 'flatpak')
+
+
+class DetailPrefetcher:
+    # Rows coming into view only warm the detail row and icon; the first screenshot is a
+    # download, so it is only warmed for rows the pointer actually rests on.
+    def __init__(self, details, queue_size=PREFETCH_QUEUE_SIZE, workers=PREFETCH_WORKERS):
+        self.details = details
+        self._condition = threading.Condition()
+        self._queue = deque(maxlen=queue_size)
+        self._queued = set()
+        self._screenshot_wanted = set()
+        self._warmed_screenshots = set()
+        self._screenshots_cancellable = Gio.Cancellable()
+
+        for _ in range(workers):
+            worker = threading.Thread(target=self._run_worker, daemon=True)
+            worker.start()
+
+    def prefetch(self, app_id, source_type, screenshot=False):
+        if source_type not in PREFETCHABLE_SOURCE_TYPES:
+            return
+        app_detail = self.details.peek(app_id, source_type)
+        if app_detail is not None:
+            if screenshot:
+                self._warm_screenshot(app_detail)
+            return
+        key = (app_id, source_type)
+        with self._condition:
+            if screenshot:
+                self._screenshot_wanted.add(key)
+            if key in self._queued:
+                return
+            if len(self._queue) == self._queue.maxlen:
+                self._queued.discard(self._queue[0])
+                self._screenshot_wanted.discard(self._queue[0])
+            self._queue.append(key)
+            self._queued.add(key)
+            self._condition.notify()
+
+    def invalidate(self):
+        # Starts a new generation: screenshot fetches still waiting for the old one are dropped.
+        with self._condition:
+            self._queue.clear()
+            self._queued.clear()
+            self._screenshot_wanted.clear()
+            self._warmed_screenshots.clear()
+            self._screenshots_cancellable.cancel()
+            self._screenshots_cancellable = Gio.Cancellable()
+
+    def _warm_screenshot(self, app_detail):
+        if not app_detail.screenshots:
+            return
+        uri = app_detail.screenshots[0]
+        with self._condition:
+            if uri in self._warmed_screenshots:
+                return
+            self._warmed_screenshots.add(uri)
+            cancellable = self._screenshots_cancellable
+        screenshot_fetcher.fetch(uri, cancellable=cancellable, priority=FETCH_PREFETCH)
+
+    def _run_worker(self):
+        while True:
+            with self._condition:
+                while not self._queue:
+                    self._condition.wait()
+                key = self._queue.pop()
+
+            app_detail = self.details.get(*key)
+            if app_detail is not None:
+                icon_service.texture(app_detail.icon, app_detail.source_type, 128)
+
+            with self._condition:
+                self._queued.discard(key)
+                wants_screenshot = key in self._screenshot_wanted
+                self._screenshot_wanted.discard(key)
+            if app_detail is not None and wants_screenshot:
+                self._warm_screenshot(app_detail)
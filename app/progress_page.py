@@ -0,0 +1,86 @@
+import gi
+
+gi.require_version('Gtk', '4.0')
+gi.require_version('Adw', '1')
+
+from gi.repository import Gtk, GLib
+
+from tracing import traced
+
+SOURCE_LABELS = {
+    "local_appstream": "Nixpkgs",
+    "flatpak": "Flathub",
+}
+
+
+class IndexingPage(Gtk.Box):
+    @traced('ui.IndexingPage')
+    def __init__(self, *args, **kwargs):
+        super().__init__(orientation=Gtk.Orientation.VERTICAL, spacing=12, *args, **kwargs)
+        self.set_hexpand(True)
+        self.set_vexpand(True)
+        self.set_halign(Gtk.Align.CENTER)
+        self.set_valign(Gtk.Align.CENTER)
+
+        self.title_label = Gtk.Label(label="Building the app catalog…")
+        self.title_label.add_css_class("title-2")
+        self.append(self.title_label)
+
+        self.progress_bar = Gtk.ProgressBar()
+        self.progress_bar.set_size_request(320, -1)
+        self.append(self.progress_bar)
+
+        self.source_labels = {}
+        for source_type, display_name in SOURCE_LABELS.items():
+            label = Gtk.Label(label=f"{display_name}: waiting")
+            label.add_css_class("dim-label")
+            label.set_halign(Gtk.Align.START)
+            self.source_labels[source_type] = label
+            self.append(label)
+
+        self.error_label = Gtk.Label()
+        self.error_label.set_wrap(True)
+        self.error_label.set_max_width_chars(60)
+        self.error_label.set_visible(False)
+        self.append(self.error_label)
+
+        self.ready_sources = set()
+        self.failed = False
+        self._pulse_id = None
+        self.connect("realize", self._on_realize)
+        self.connect("unrealize", self._on_unrealize)
+
+    def _on_pulse(self):
+        self.progress_bar.pulse()
+        return GLib.SOURCE_CONTINUE
+
+    def _on_realize(self, widget):
+        if not self._pulse_id and not self.failed:
+            self._pulse_id = GLib.timeout_add(120, self._on_pulse)
+
+    def _on_unrealize(self, widget):
+        if self._pulse_id:
+            GLib.source_remove(self._pulse_id)
+            self._pulse_id = None
+
+    def update_source(self, source_type, count):
+        label = self.source_labels.get(source_type)
+        if label:
+            label.set_label(f"{SOURCE_LABELS[source_type]}: {count:,} components indexed")
+
+    def mark_source_ready(self, source_type):
+        self.ready_sources.add(source_type)
+        label = self.source_labels.get(source_type)
+        if label:
+            label.set_label(f"{SOURCE_LABELS[source_type]}: ready")
+
+    def show_error(self, message):
+        self.failed = True
+        self._on_unrealize(self)
+        self.title_label.set_label("Could not build the app catalog")
+        self.progress_bar.set_visible(False)
+        for source_type, label in self.source_labels.items():
+            if source_type not in self.ready_sources:
+                label.set_label(f"{SOURCE_LABELS[source_type]}: failed")
+        self.error_label.set_label(message)
+        self.error_label.set_visible(True)
@@ -0,0 +1,130 @@
+import argparse
+import itertools
+import json
+import sys
+
+import catalog
+from catalog import AppCard
+
+# The field each operation reads its argument from.
+OPERATION_FIELDS = {
+    'resolve': 'id',
+    'search': 'query',
+    'category': 'category',
+}
+
+SOURCES = ('all', 'nixpkgs', 'flatpak')
+
+DEFAULT_LIMIT = 20
+
+# Lines are answered a block at a time so resolves share one query and output keeps streaming.
+BLOCK_SIZE = 500
+
+
+def _card(card):
+    return {field: getattr(card, field) for field in AppCard.__slots__}
+
+
+def parse_request(line, defaults):
+    line = line.strip()
+    if line.startswith('{'):
+        request = json.loads(line)
+        if not isinstance(request, dict):
+            raise ValueError("a request must be a JSON object")
+    else:
+        request = {OPERATION_FIELDS[defaults['op']]: line}
+
+    for key, value in defaults.items():
+        request.setdefault(key, value)
+    if request['op'] not in OPERATION_FIELDS:
+        raise ValueError(f"unknown op {request['op']!r}, expected one of {', '.join(OPERATION_FIELDS)}")
+    if request['source'] not in SOURCES:
+        raise ValueError(f"unknown source {request['source']!r}, expected one of {', '.join(SOURCES)}")
+    field = OPERATION_FIELDS[request['op']]
+    if not isinstance(request.get(field), str):
+        raise ValueError(f"{request['op']} needs a string {field!r}")
+    return request
+
+
+def answer(conn, request, resolved):
+    op = request['op']
+    if op == 'resolve':
+        app_refs = [app_ref for app_ref in resolved.get(request['id'], ())
+                    if request['source'] == 'all' or app_ref['source_type'] == catalog.SOURCE_CATALOGS[request['source']]]
+        if not app_refs:
+            return {'op': op, 'id': request['id'], 'found': False}
+        # The same ID can ship in both catalogs; the first one answers and the rest are named.
+        result = dict({'op': op, 'found': True}, **app_refs[0])
+        if len(app_refs) > 1:
+            result['other_sources'] = [app_ref['source_type'] for app_ref in app_refs[1:]]
+        return result
+
+    if op == 'search':
+        cards = catalog.search_local_apps(conn, request['query'], int(request['limit']),
+                                          request['source'], int(request.get('offset', 0)), bool(request.get('fuzzy', True)))
+        return {'op': op, 'query': request['query'], 'source': request['source'], 'results': [_card(card) for card in cards]}
+
+    cards = catalog.get_apps_by_category(conn, request['category'], int(request['limit']),
+                                         request['source'], int(request.get('offset', 0)))
+    return {'op': op, 'category': request['category'], 'source': request['source'], 'results': [_card(card) for card in cards]}
+
+
+def answer_block(conn, lines, defaults):
+    requests = []
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            requests.append((line, parse_request(line, defaults)))
+        except (TypeError, ValueError) as e:
+            requests.append((line, e))
+
+    resolved = catalog.resolve_app_ids(
+        conn, [request['id'] for _, request in requests if isinstance(request, dict) and request['op'] == 'resolve'])
+
+    for line, request in requests:
+        if isinstance(request, Exception):
+            yield {'error': str(request), 'input': line.strip()}
+            continue
+        try:
+            yield answer(conn, request, resolved)
+        except (TypeError, ValueError) as e:
+            yield {'error': str(e), 'input': line.strip()}
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Answer catalog queries from stdin as JSON Lines, without starting the store.",
+        epilog="Each input line is an app ID, search query or category name for OP, or a JSON object such as "
+               '{"op": "search", "query": "firefox", "source": "flatpak", "limit": 5}.')
+    parser.add_argument('op', nargs='?', choices=tuple(OPERATION_FIELDS), default='resolve',
+                        help="what plain input lines are (default: %(default)s)")
+    parser.add_argument('--source', choices=SOURCES, default='all', help="catalog to search or list (default: %(default)s)")
+    parser.add_argument('--limit', type=int, default=DEFAULT_LIMIT, help="results per search or category (default: %(default)s)")
+    parser.add_argument('--no-refresh', action='store_true',
+                        help="answer from the cached catalog without checking the catalog files for changes")
+    args = parser.parse_args()
+
+    if args.no_refresh:
+        # Only makes sure the tables exist, so a missing or outdated cache reads as empty.
+        conn = catalog.connection()
+        catalog.create_db(conn)
+        if not conn.execute('SELECT 1 FROM catalog_sources LIMIT 1').fetchone():
+            parser.exit(1, f"{parser.prog}: no cached catalog yet; run once without --no-refresh to build it\n")
+    else:
+        conn = catalog.ensure_db()
+
+    defaults = {'op': args.op, 'source': args.source, 'limit': args.limit}
+    out = sys.stdout
+    while True:
+        lines = list(itertools.islice(sys.stdin, BLOCK_SIZE))
+        if not lines:
+            break
+        for result in answer_block(conn, lines, defaults):
+            out.write(json.dumps(result, ensure_ascii=False))
+            out.write('\n')
+        out.flush()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,236 @@
+import hashlib
+import os
+import tempfile
+import threading
+import traceback
+from collections import deque
+
+import gi
+
+gi.require_version('Gtk', '4.0')
+gi.require_version('GdkPixbuf', '2.0')
+
+from gi.repository import Gdk, GdkPixbuf, Gio, GLib
+
+from catalog.paths import SCREENSHOT_CACHE_DIR
+from tracing import traced
+
+SCREENSHOT_WIDTH = 800
+SCREENSHOT_HEIGHT = 450
+
+SCREENSHOT_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+SCREENSHOT_FETCH_CONCURRENCY = 3
+
+# Fetch priorities, most urgent first: what an open page shows, then guesses at what opens next.
+FETCH_VISIBLE = 0
+FETCH_PREFETCH = 1
+
+# How many fetches may wait per priority. Past that the oldest waiting one is dropped, since
+# whoever asked for it has most likely scrolled or navigated away by now.
+SCREENSHOT_QUEUE_SIZES = (32, 8)
+
+
+class ScreenshotCache:
+    # Entries are plain files; their mtime doubles as the LRU clock and is bumped on every hit.
+    def __init__(self, directory=SCREENSHOT_CACHE_DIR, max_bytes=SCREENSHOT_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    def _path(self, uri, variant):
+        digest = hashlib.sha256(uri.encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, f"{digest}-{variant}")
+
+    def lookup(self, uri, variant):
+        path = self._path(uri, variant)
+        try:
+            os.utime(path)
+        except OSError:
+            return None
+        return path
+
+    def store(self, uri, variant, data):
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(uri, variant)
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, prefix='.partial-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(temp_path, path)
+        except OSError:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+            return None
+        self.evict()
+        return path
+
+    def evict(self):
+        with self._lock:
+            entries = []
+            total = 0
+            try:
+                with os.scandir(self.directory) as it:
+                    for entry in it:
+                        if entry.name.startswith('.partial-') or not entry.is_file():
+                            continue
+                        stat = entry.stat()
+                        entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+                        total += stat.st_size
+            except OSError:
+                return
+
+            entries.sort()
+            for _, size, path in entries:
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.unlink(path)
+                    total -= size
+                except OSError:
+                    pass
+
+
+def _decode_at_scale(data, width, height, cancellable=None):
+    # The pixbuf loader is told the target box up front, so decoders that support it
+    # (JPEG in particular) never materialize the full-resolution image.
+    stream = Gio.MemoryInputStream.new_from_bytes(GLib.Bytes.new(data))
+    return GdkPixbuf.Pixbuf.new_from_stream_at_scale(stream, width, height, True, cancellable)
+
+
+@traced('screenshots.decode')
+def decode_screenshot(uri, width=SCREENSHOT_WIDTH, height=SCREENSHOT_HEIGHT, cancellable=None, cache=None):
+    thumbnail_variant = f"{width}x{height}.png"
+    if cache:
+        thumbnail_path = cache.lookup(uri, thumbnail_variant)
+        if thumbnail_path:
+            try:
+                return Gdk.Texture.new_from_filename(thumbnail_path)
+            except GLib.Error:
+                pass
+
+    source_path = cache.lookup(uri, 'source') if cache else None
+    if source_path:
+        with open(source_path, 'rb') as f:
+            data = f.read()
+    else:
+        _, data, _ = Gio.File.new_for_uri(uri).load_contents(cancellable)
+        if cache:
+            cache.store(uri, 'source', data)
+
+    pixbuf = _decode_at_scale(data, width, height, cancellable)
+    if cache:
+        _, thumbnail_data = pixbuf.save_to_bufferv('png', [], [])
+        cache.store(uri, thumbnail_variant, thumbnail_data)
+    return Gdk.Texture.new_for_pixbuf(pixbuf)
+
+
+class ScreenshotFetch:
+    __slots__ = ('run', 'cancellable', '_cancelled')
+
+    def __init__(self, run, cancellable=None):
+        self.run = run
+        self.cancellable = cancellable
+        self._cancelled = False
+
+    @property
+    def cancelled(self):
+        return self._cancelled or (self.cancellable is not None and self.cancellable.is_cancelled())
+
+    def cancel(self):
+        self._cancelled = True
+
+
+class ScreenshotFetcher:
+    # A fixed set of workers drains one bounded queue per priority; visible fetches always go
+    # first, and the newest prefetch beats older ones the user has already moved past. Prefetches
+    # never occupy every worker, so a page opened mid-scroll doesn't wait out a download.
+    def __init__(self, cache=None, max_concurrent=SCREENSHOT_FETCH_CONCURRENCY, queue_sizes=SCREENSHOT_QUEUE_SIZES):
+        self.cache = cache
+        self.max_concurrent = max_concurrent
+        self._condition = threading.Condition()
+        self._visible = deque(maxlen=queue_sizes[FETCH_VISIBLE])
+        self._prefetch = deque(maxlen=queue_sizes[FETCH_PREFETCH])
+        self._workers = []
+        self._prefetches_running = 0
+
+    def fetch(self, uri, on_loaded=None, cancellable=None, width=SCREENSHOT_WIDTH, height=SCREENSHOT_HEIGHT,
+              priority=FETCH_VISIBLE):
+        def decode_in_background():
+            if cancellable is not None and cancellable.is_cancelled():
+                return
+            try:
+                texture = decode_screenshot(uri, width, height, cancellable, self.cache)
+            except (GLib.Error, OSError):
+                return
+            if on_loaded is not None and (cancellable is None or not cancellable.is_cancelled()):
+                GLib.idle_add(_deliver, texture)
+
+        def _deliver(texture):
+            if cancellable is None or not cancellable.is_cancelled():
+                on_loaded(texture)
+            return GLib.SOURCE_REMOVE
+
+        task = ScreenshotFetch(decode_in_background, cancellable)
+        queue = self._visible if priority == FETCH_VISIBLE else self._prefetch
+        with self._condition:
+            if len(queue) == queue.maxlen:
+                # Cancelled fetches give up their place before a live one is pushed out.
+                live = [waiting for waiting in queue if not waiting.cancelled]
+                queue.clear()
+                queue.extend(live)
+            queue.append(task)
+            while len(self._workers) < self.max_concurrent:
+                worker = threading.Thread(target=self._run_worker, name='screenshot', daemon=True)
+                worker.start()
+                self._workers.append(worker)
+            self._condition.notify()
+        return task
+
+    def _can_prefetch(self):
+        return self._prefetch and self._prefetches_running < max(self.max_concurrent - 1, 1)
+
+    def _run_worker(self):
+        while True:
+            with self._condition:
+                while not self._visible and not self._can_prefetch():
+                    self._condition.wait()
+                prefetching = not self._visible
+                if prefetching:
+                    task = self._prefetch.pop()
+                    self._prefetches_running += 1
+                else:
+                    task = self._visible.popleft()
+
+            try:
+                if not task.cancelled:
+                    task.run()
+            except Exception:
+                # The pool is fixed, so a worker must outlive whatever one fetch ran into.
+                traceback.print_exc()
+            finally:
+                if prefetching:
+                    with self._condition:
+                        self._prefetches_running -= 1
+                        self._condition.notify()
+
+
+class ScreenshotFetchGroup:
+    # Everything a single page asked for, so tearing the page down can drop it all at once.
+    def __init__(self, fetcher=None):
+        self.fetcher = fetcher or screenshot_fetcher
+        self.cancellable = Gio.Cancellable()
+        self._fetches = []
+
+    def fetch(self, uri, on_loaded, width=SCREENSHOT_WIDTH, height=SCREENSHOT_HEIGHT):
+        self._fetches.append(self.fetcher.fetch(uri, on_loaded, self.cancellable, width, height))
+
+    def cancel(self):
+        self.cancellable.cancel()
+        for fetch in self._fetches:
+            fetch.cancel()
+        self._fetches.clear()
+
+
+screenshot_cache = ScreenshotCache()
+screenshot_fetcher = ScreenshotFetcher(screenshot_cache)
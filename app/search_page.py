@@ -1,129 +1,190 @@
 import gi
-import os
 
 gi.require_version('Gtk', '4.0')
 gi.require_version('Adw', '1')
 
-from gi.repository import Gtk, Adw
+from gi.repository import Gtk, Adw, Gio, GObject
+
+from icon_service import icon_service
+from tracing import traced
+
+SEARCH_PAGE_SIZE = 50
+
+# Start fetching the next page while this many pixels of results are still below the viewport.
+LOAD_MORE_THRESHOLD = 800
+
+
+class SearchResult(GObject.Object):
+    __gtype_name__ = 'AlloySearchResult'
+
+    def __init__(self, card):
+        super().__init__()
+        self.card = card
+
+    @property
+    def display_name(self):
+        if self.card.source_type == 'nixpkgs_search':
+            return f"{self.card.name} (Nixpkgs)"
+        elif self.card.source_type == 'flatpak':
+            return f"{self.card.name} (Flatpak)"
+        return self.card.name
 
-from landing import ICON_BASE_PATH, GENERIC_ICON_NAMES
 
 class SearchPage(Gtk.Box):
-    def __init__(self, apps, main_window, *args, **kwargs):
+    @traced('ui.SearchPage')
+    def __init__(self, apps, main_window, fetch_page=None, *args, **kwargs):
         super().__init__(orientation=Gtk.Orientation.VERTICAL, *args, **kwargs)
         self.set_hexpand(True)
         self.set_vexpand(True)
 
-        scrolled_window = Gtk.ScrolledWindow()
-        scrolled_window.set_hexpand(True)
-        scrolled_window.set_vexpand(True)
-        scrolled_window.set_policy(Gtk.PolicyType.NEVER, Gtk.PolicyType.AUTOMATIC)
-
-        content_box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=12)
-        content_box.set_margin_start(24)
-        content_box.set_margin_end(24)
-        content_box.set_margin_top(24)
-        content_box.set_margin_bottom(24)
-        content_box.set_hexpand(True)
-        content_box.set_vexpand(False)
-
-        scrolled_window.set_child(content_box)
-        self.append(scrolled_window)
-
         self.main_window = main_window
-
-        if not apps:
-            no_results_label = Gtk.Label(label="No results found.")
-            no_results_label.add_css_class("title-2")
-            no_results_label.set_halign(Gtk.Align.CENTER)
-            content_box.append(no_results_label)
+        self.fetch_page = fetch_page
+        self._local_count = 0
+        self._loading = False
+        self._exhausted = fetch_page is None or len(apps) < SEARCH_PAGE_SIZE
+
+        self.store = Gio.ListStore.new(SearchResult)
+
+        factory = Gtk.SignalListItemFactory()
+        factory.connect("setup", self._on_setup_row)
+        factory.connect("bind", self._on_bind_row)
+
+        list_view = Gtk.ListView.new(Gtk.NoSelection.new(self.store), factory)
+        list_view.set_single_click_activate(True)
+        list_view.set_margin_start(24)
+        list_view.set_margin_end(24)
+        list_view.connect("activate", self._on_row_activated)
+
+        self.scrolled_window = Gtk.ScrolledWindow()
+        self.scrolled_window.set_hexpand(True)
+        self.scrolled_window.set_vexpand(True)
+        self.scrolled_window.set_policy(Gtk.PolicyType.NEVER, Gtk.PolicyType.AUTOMATIC)
+        self.scrolled_window.set_child(list_view)
+
+        vadjustment = self.scrolled_window.get_vadjustment()
+        vadjustment.connect("value-changed", self._on_scrolled)
+        vadjustment.connect("changed", self._on_scrolled)
+
+        no_results_label = Gtk.Label(label="No results found.")
+        no_results_label.add_css_class("title-2")
+        no_results_label.set_halign(Gtk.Align.CENTER)
+        no_results_label.set_valign(Gtk.Align.START)
+        no_results_label.set_margin_top(24)
+
+        self.stack = Gtk.Stack()
+        self.stack.add_named(self.scrolled_window, "results")
+        self.stack.add_named(no_results_label, "empty")
+        self.append(self.stack)
+
+        self.append_local_results(apps)
+
+    def _update_empty_state(self):
+        self.stack.set_visible_child_name("results" if self.store.get_n_items() else "empty")
+
+    def append_local_results(self, apps):
+        # Local pages stay ahead of anything appended by other backends.
+        items = [SearchResult(card) for card in apps]
+        self.store.splice(self._local_count, 0, items)
+        self._local_count += len(items)
+        self._update_empty_state()
+
+    def append_results(self, apps):
+        items = [SearchResult(card) for card in apps]
+        self.store.splice(self.store.get_n_items(), 0, items)
+        self._update_empty_state()
+
+    def _on_scrolled(self, adjustment):
+        if self._loading or self._exhausted:
             return
-
-        for app_data in apps:
-            app_id = app_data.get('id')
-            display_name = app_data.get('name')
-            description = app_data.get('summary')
-            icon_name = app_data.get('icon')
-            source_type = app_data.get('source_type', 'local_appstream')
-
-            if source_type == 'nixpkgs_search':
-                display_name = f"{display_name} (Nixpkgs)"
-            elif source_type == 'flatpak':
-                display_name = f"{display_name} (Flatpak)"
-
-            icon_path = None
-            if ICON_BASE_PATH:
-                candidate_name = icon_name
-                if not icon_name.lower().endswith('.png'):
-                    candidate_name = icon_name + ".png"
-                candidate = os.path.join(ICON_BASE_PATH, candidate_name)
-                if os.path.isfile(candidate):
-                    icon_path = candidate
-
-            icon_image = None
-            placeholder_path = os.path.join(os.path.dirname(__file__), "..", "images", "placeholder.png")
-            placeholder_exists = os.path.exists(placeholder_path)
-
-            if icon_name in GENERIC_ICON_NAMES:
-                if placeholder_exists:
-                    icon_image = Gtk.Image.new_from_file(placeholder_path)
-            else:
-                if source_type == 'flatpak':
-                    flatpak_icon_path = os.path.join(os.path.expanduser('~'), '.local', 'share', 'flatpak', 'appstream', 'flathub', 'x86_64', 'active', 'icons', '64x64', f"{icon_name}.png")
-                    if os.path.exists(flatpak_icon_path):
-                        icon_image = Gtk.Image.new_from_file(flatpak_icon_path)
-
-                if not icon_image and icon_path and os.path.exists(icon_path):
-                    icon_image = Gtk.Image.new_from_file(icon_path)
-
-            if not icon_image:
-                if placeholder_exists:
-                    icon_image = Gtk.Image.new_from_file(placeholder_path)
-                else:
-                    icon_image = Gtk.Image.new_from_icon_name("image-missing")
-
-            icon_image.set_pixel_size(64)
-
-            button = Gtk.Button()
-            button.set_hexpand(True)
-            button.set_vexpand(False)
-            button.set_margin_top(6)
-            button.set_margin_bottom(6)
-            button.set_margin_start(6)
-            button.set_margin_end(6)
-            button.add_css_class("flat")
-
-            hbox = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=12)
-            hbox.set_hexpand(True)
-
-            icon = icon_image
-            icon.set_valign(Gtk.Align.CENTER)
-
-            vbox = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=4)
-            vbox.set_hexpand(True)
-
-            title_label = Gtk.Label(label=display_name)
-            title_label.set_halign(Gtk.Align.START)
-            title_label.add_css_class("title-3")
-            title_label.set_hexpand(True)
-
-            description_label = Gtk.Label(label=description)
-            description_label.set_halign(Gtk.Align.START)
-            description_label.add_css_class("dim-label")
-            description_label.set_wrap(True)
-            description_label.set_max_width_chars(80)
-            description_label.set_hexpand(True)
-
-            vbox.append(title_label)
-            vbox.append(description_label)
-
-            hbox.append(icon)
-            hbox.append(vbox)
-
-            button.set_child(hbox)
-            content_box.append(button)
-
-            def on_button_clicked(btn, app_id=app_id, source_type=source_type):
-                self.main_window.show_detail(app_id, source_type=source_type)
-
-            button.connect("clicked", on_button_clicked)
\ No newline at end of file
+        remaining = adjustment.get_upper() - adjustment.get_value() - adjustment.get_page_size()
+        if remaining < LOAD_MORE_THRESHOLD:
+            self._load_more()
+
+    def _load_more(self):
+        # fetch_page runs in the background and calls back on the main loop.
+        self._loading = True
+        self.fetch_page(self._local_count, SEARCH_PAGE_SIZE, self._on_page_loaded)
+
+    def _on_page_loaded(self, apps):
+        self._loading = False
+        self._exhausted = len(apps) < SEARCH_PAGE_SIZE
+        self.append_local_results(apps)
+        self._on_scrolled(self.scrolled_window.get_vadjustment())
+
+    def _on_setup_row(self, factory, list_item):
+        hbox = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=12)
+        hbox.set_hexpand(True)
+        hbox.set_margin_top(6)
+        hbox.set_margin_bottom(6)
+        hbox.set_margin_start(6)
+        hbox.set_margin_end(6)
+
+        icon = Gtk.Image()
+        icon.set_pixel_size(64)
+        icon.set_valign(Gtk.Align.CENTER)
+
+        vbox = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=4)
+        vbox.set_hexpand(True)
+        vbox.set_valign(Gtk.Align.CENTER)
+
+        title_label = Gtk.Label()
+        title_label.set_halign(Gtk.Align.START)
+        title_label.add_css_class("title-3")
+        title_label.set_hexpand(True)
+
+        description_label = Gtk.Label()
+        description_label.set_halign(Gtk.Align.START)
+        description_label.add_css_class("dim-label")
+        description_label.set_wrap(True)
+        description_label.set_max_width_chars(80)
+        description_label.set_hexpand(True)
+
+        vbox.append(title_label)
+        vbox.append(description_label)
+
+        installed_label = Gtk.Label(label="Installed")
+        installed_label.set_valign(Gtk.Align.CENTER)
+        installed_label.add_css_class("caption")
+        installed_label.add_css_class("success")
+
+        hbox.append(icon)
+        hbox.append(vbox)
+        hbox.append(installed_label)
+
+        list_item.set_child(hbox)
+
+        def on_row_hovered(*args):
+            self._prefetch(list_item.get_item(), screenshot=True)
+
+        motion_controller = Gtk.EventControllerMotion()
+        motion_controller.connect("enter", on_row_hovered)
+        hbox.add_controller(motion_controller)
+
+    def _on_bind_row(self, factory, list_item):
+        card = list_item.get_item().card
+        hbox = list_item.get_child()
+        icon = hbox.get_first_child()
+        title_label = icon.get_next_sibling().get_first_child()
+        description_label = title_label.get_next_sibling()
+        installed_label = hbox.get_last_child()
+
+        texture = icon_service.texture(card.icon, card.source_type, 64)
+        if texture is not None:
+            icon.set_from_paintable(texture)
+        else:
+            icon.set_from_icon_name("image-missing")
+        title_label.set_label(list_item.get_item().display_name)
+        description_label.set_label(card.summary or '')
+        installed_label.set_visible(card.installed)
+
+        # Rows are only bound when they come into view.
+        self._prefetch(list_item.get_item())
+
+    def _prefetch(self, result, screenshot=False):
+        if result is not None:
+            self.main_window.prefetch_detail(result.card.id, result.card.source_type, screenshot)
+
+    def _on_row_activated(self, list_view, position):
+        result = self.store.get_item(position)
+        if result:
+            self.main_window.show_detail(result.card.id, source_type=result.card.source_type)
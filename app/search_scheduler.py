@@ -0,0 +1,104 @@
+import threading
+import traceback
+from collections import deque
+
+from gi.repository import Gio, GLib
+
+SEARCH_DEBOUNCE_MS = 200
+
+
+class SearchJob:
+    def __init__(self, generation, query, source):
+        self.generation = generation
+        self.query = query
+        self.source = source
+        self.cancellable = Gio.Cancellable()
+
+    @property
+    def cancelled(self):
+        return self.cancellable.is_cancelled()
+
+    def cancel(self):
+        self.cancellable.cancel()
+
+
+class SearchScheduler:
+    def __init__(self, run_search, on_results, delay_ms=SEARCH_DEBOUNCE_MS):
+        self.run_search = run_search
+        self.on_results = on_results
+        self.delay_ms = delay_ms
+        self.generation = 0
+        self._pending_source_id = None
+        self._pending_job = None
+        self._running_job = None
+        self._condition = threading.Condition()
+        self._queue = deque()
+
+        # Searches and result pages all run on one long-lived worker, so its thread-local
+        # catalog connection, page cache and prepared statements stay warm between keystrokes.
+        worker = threading.Thread(target=self._run_worker, daemon=True)
+        worker.start()
+
+    def schedule(self, query, source):
+        self.cancel()
+        self._pending_job = SearchJob(self.generation, query, source)
+        self._pending_source_id = GLib.timeout_add(self.delay_ms, self._on_debounce_elapsed)
+
+    def cancel(self):
+        # Every schedule or cancel starts a new generation, so results still in flight are dropped.
+        self.generation += 1
+        if self._pending_source_id:
+            GLib.source_remove(self._pending_source_id)
+            self._pending_source_id = None
+        self._pending_job = None
+        if self._running_job:
+            self._running_job.cancel()
+            self._running_job = None
+        with self._condition:
+            self._queue = deque(work for work in self._queue if work[0] is None)
+
+    def _on_debounce_elapsed(self):
+        self._pending_source_id = None
+        job, self._pending_job = self._pending_job, None
+        if job is None:
+            return GLib.SOURCE_REMOVE
+
+        self._running_job = job
+        self._submit(job, lambda: self.run_search(job), lambda results: self.on_results(job, results))
+        return GLib.SOURCE_REMOVE
+
+    def fetch_page(self, fetch, on_loaded):
+        # Pages aren't tied to a generation: a results page shown again after a detail view
+        # must still be able to load more.
+        self._submit(None, fetch, on_loaded)
+
+    def _submit(self, job, work, on_done):
+        with self._condition:
+            self._queue.append((job, work, on_done))
+            self._condition.notify()
+
+    def _run_worker(self):
+        while True:
+            with self._condition:
+                while not self._queue:
+                    self._condition.wait()
+                job, work, on_done = self._queue.popleft()
+
+            if job is not None and not self.is_current(job):
+                continue
+            try:
+                result = work()
+            except Exception:
+                # The worker outlives a failed search; later ones still need it.
+                traceback.print_exc()
+                continue
+            if job is None or not job.cancelled:
+                GLib.idle_add(self._deliver, job, on_done, result)
+
+    def is_current(self, job):
+        return not job.cancelled and job.generation == self.generation
+
+    def _deliver(self, job, on_done, result):
+        if job is None or self.is_current(job):
+            on_done(result)
+        return GLib.SOURCE_REMOVE
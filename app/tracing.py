@@ -0,0 +1,165 @@
+import atexit
+import functools
+import json
+import os
+import sys
+import threading
+import time
+
+# Set to a file path to record a Chrome trace there, or to 1 for the default location.
+TRACE_ENV = 'ALLOY_STORE_TRACE'
+
+DEFAULT_TRACE_PATH = os.path.expanduser('~/.cache/alloy_store_trace.json')
+
+SUMMARY_PERCENTILES = (50, 90, 99)
+
+
+class Span:
+    __slots__ = ('recorder', 'name', 'args', 'start')
+
+    def __init__(self, recorder, name, args):
+        self.recorder = recorder
+        self.name = name
+        self.args = args
+        self.start = time.perf_counter_ns()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.end()
+        return False
+
+    def end(self, **args):
+        if self.start is None:
+            return
+        if args:
+            self.args = dict(self.args, **args) if self.args else args
+        self.recorder.record(self.name, self.start, time.perf_counter_ns(), self.args)
+        self.start = None
+
+
+class NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def end(self, **args):
+        pass
+
+
+NULL_SPAN = NullSpan()
+
+
+class TraceRecorder:
+    def __init__(self, path):
+        self.path = path
+        self.pid = os.getpid()
+        self.origin = time.perf_counter_ns()
+        # list.append and dict.setdefault are atomic, so worker threads record without a lock.
+        self.events = []
+        self.thread_names = {}
+
+    def record(self, name, start, end, args):
+        tid = threading.get_native_id()
+        if tid not in self.thread_names:
+            self.thread_names.setdefault(tid, threading.current_thread().name)
+        self.events.append((name, start, end, tid, args))
+
+    def trace_events(self):
+        events = [
+            {'name': 'thread_name', 'ph': 'M', 'pid': self.pid, 'tid': tid, 'args': {'name': thread_name}}
+            for tid, thread_name in self.thread_names.items()
+        ]
+        for name, start, end, tid, args in list(self.events):
+            event = {
+                'name': name,
+                'cat': name.split('.', 1)[0],
+                'ph': 'X',
+                'ts': (start - self.origin) / 1000,
+                'dur': (end - start) / 1000,
+                'pid': self.pid,
+                'tid': tid,
+            }
+            if args:
+                event['args'] = args
+            events.append(event)
+        return events
+
+    def write(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.path, 'w') as f:
+            json.dump({'traceEvents': self.trace_events(), 'displayTimeUnit': 'ms'}, f, default=str)
+
+    def summary(self):
+        durations = {}
+        for name, start, end, _, _ in list(self.events):
+            durations.setdefault(name, []).append((end - start) / 1e6)
+
+        header = ['span', 'count'] + [f'p{percentile}' for percentile in SUMMARY_PERCENTILES] + ['max', 'total']
+        rows = []
+        for name, samples in durations.items():
+            samples.sort()
+            # Nearest-rank percentiles; the sample counts here are too small for interpolation to matter.
+            percentiles = [samples[max(0, -(-len(samples) * percentile // 100) - 1)] for percentile in SUMMARY_PERCENTILES]
+            rows.append((name, len(samples), *percentiles, samples[-1], sum(samples)))
+        rows.sort(key=lambda row: row[-1], reverse=True)
+
+        name_width = max([len(header[0])] + [len(row[0]) for row in rows])
+        lines = [f"{header[0]:<{name_width}} {header[1]:>7}" + ''.join(f" {column:>10}" for column in header[2:])]
+        for name, count, *times in rows:
+            lines.append(f"{name:<{name_width}} {count:>7}" + ''.join(f" {value:>10.2f}" for value in times))
+        return '\n'.join(lines)
+
+    def flush(self):
+        try:
+            self.write()
+        except OSError as e:
+            print(f"Could not write trace to {self.path}: {e}", file=sys.stderr)
+        print(f"Span latencies in ms (trace written to {self.path}):", file=sys.stderr)
+        print(self.summary(), file=sys.stderr)
+
+
+_recorder = None
+
+
+def enabled():
+    return _recorder is not None
+
+
+def span(name, **args):
+    if _recorder is None:
+        return NULL_SPAN
+    return Span(_recorder, name, args)
+
+
+def traced(name):
+    # Decorating is decided once at import time, so disabled tracing leaves the function untouched.
+    def decorate(function):
+        if _recorder is None:
+            return function
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with Span(_recorder, name, None):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def _enable_from_environment():
+    global _recorder
+    value = os.environ.get(TRACE_ENV)
+    if not value or value == '0':
+        return
+    _recorder = TraceRecorder(DEFAULT_TRACE_PATH if value == '1' else value)
+    atexit.register(_recorder.flush)
+
+
+_enable_from_environment()
@@ -0,0 +1,66 @@
+import argparse
+import os
+import subprocess
+import sys
+
+APP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app')
+
+# Cumulative import time allowed for the GTK-free catalog core, in milliseconds.
+CATALOG_BUDGET_MS = 50
+
+# Only needed once an ingest or a query actually runs.
+LAZY_MODULES = ('yaml', 'gzip', 'xml.etree.ElementTree', 'sqlite3')
+
+# Everything main.py imports at startup, checked when PyGObject is available.
+UI_MODULES = ('landing', 'detail_page', 'search_page', 'progress_page', 'nix_search', 'prefetch', 'search_scheduler')
+
+
+def import_times(modules):
+    # -X importtime lines look like "import time: self [us] | cumulative | imported package".
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f"import {', '.join(modules)}"],
+        cwd=APP_DIR, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = (field.strip() for field in line[len('import time:'):].split('|'))
+        times[name.strip()] = int(cumulative) / 1000
+    return times
+
+
+def check(modules, budget_ms, forbidden):
+    times = import_times(modules)
+    failures = [f"{name} is imported at startup" for name in forbidden if name in times]
+
+    total = sum(times.get(name, 0) for name in modules)
+    if budget_ms is not None and total > budget_ms:
+        slowest = sorted(times.items(), key=lambda item: item[1], reverse=True)[:10]
+        failures.append(f"import {', '.join(modules)} took {total:.1f} ms (budget {budget_ms} ms); slowest: "
+                        + ', '.join(f"{name} {ms:.1f} ms" for name, ms in slowest))
+    print(f"import {', '.join(modules)}: {total:.1f} ms")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check what the store imports at startup and how long it takes.")
+    parser.add_argument('--budget-ms', type=float, default=CATALOG_BUDGET_MS)
+    args = parser.parse_args()
+
+    failures = check(('catalog',), args.budget_ms, LAZY_MODULES + ('gi',))
+
+    try:
+        failures += check(UI_MODULES, None, LAZY_MODULES)
+    except RuntimeError as e:
+        print(f"skipping UI modules: {e}")
+
+    for failure in failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
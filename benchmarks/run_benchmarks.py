@@ -0,0 +1,226 @@
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import catalog
+from catalog import db as catalog_db, paths as catalog_paths
+from synthetic_catalog import write_appstream_yaml, write_flathub_xml
+
+DEFAULT_SIZES = (1000, 10000, 50000, 200000)
+
+SEARCH_QUERIES = ('fox', 'editor', 'music player', 'gim', 'code debugger', 'terminal', 'ka', 'zzzz')
+
+QUERY_SOURCES = ('nixpkgs', 'flatpak')
+
+DETAIL_SAMPLES = 200
+
+# App names with a letter dropped, which no FTS prefix query matches.
+FUZZY_SAMPLES = 100
+
+
+def _timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return time.perf_counter() - start, result
+
+
+def _summary(samples):
+    samples = sorted(samples)
+    return {
+        'count': len(samples),
+        'min': samples[0],
+        'p50': statistics.median(samples),
+        'p95': samples[min(len(samples) - 1, int(len(samples) * 0.95))],
+        'max': samples[-1],
+    }
+
+
+def _repeat(function, args_list, repeat):
+    samples = []
+    for _ in range(repeat):
+        for args in args_list:
+            samples.append(_timed(function, *args)[0])
+    return _summary(samples)
+
+
+def bench_ingest(conn, results):
+    results['populate_db'] = _timed(catalog.populate_db, conn)[0]
+    results['populate_flatpak_apps'] = _timed(catalog.populate_flatpak_apps, conn)[0]
+    results['ensure_featured_rotation'] = _timed(catalog.ensure_featured_rotation, conn, True)[0]
+
+    # Same files again: only the diff against the stored rows is left to do.
+    results['populate_db_unchanged'] = _timed(catalog.populate_db, conn)[0]
+    results['populate_flatpak_apps_unchanged'] = _timed(catalog.populate_flatpak_apps, conn)[0]
+
+
+def _typo(name, rng):
+    position = rng.randrange(1, len(name) - 1)
+    return name[:position] + name[position + 1:]
+
+
+def bench_queries(conn, results, repeat):
+    # Built up front so the first fuzzy fallback below doesn't pay for it.
+    results['trigram_index.build'] = _timed(catalog.trigram_index.build, conn)[0]
+
+    rng = random.Random(0)
+    names = [row[0] for row in conn.execute('SELECT name FROM apps WHERE length(name) > 3')]
+    typos = [_typo(name, rng) for name in rng.sample(names, min(FUZZY_SAMPLES, len(names)))]
+    results['trigram_index.search'] = _repeat(catalog.trigram_index.search, [(query, 200) for query in typos], repeat)
+
+    for source in QUERY_SOURCES:
+        results[f'search_local_apps[{source}]'] = _repeat(
+            catalog.search_local_apps,
+            [(conn, query, 50, source) for query in SEARCH_QUERIES], repeat)
+        results[f'search_local_apps_page2[{source}]'] = _repeat(
+            catalog.search_local_apps,
+            [(conn, query, 50, source, 50) for query in SEARCH_QUERIES], repeat)
+        results[f'search_local_apps_fuzzy[{source}]'] = _repeat(
+            catalog.search_local_apps,
+            [(conn, query, 50, source) for query in typos], repeat)
+
+        categories = catalog.ROTATION_CATEGORIES + ('Graphics', 'Utility')
+        results[f'get_apps_by_category[{source}]'] = _repeat(
+            catalog.get_apps_by_category,
+            [(conn, category, 18, source) for category in categories], repeat)
+
+    app_keys = conn.execute('SELECT id, source_type FROM apps').fetchall()
+    sample = random.Random(0).sample(app_keys, min(DETAIL_SAMPLES, len(app_keys)))
+    # Called directly so the detail cache in front of it doesn't hide the query.
+    results['get_app_details_from_db'] = _repeat(catalog.get_app_details_from_db, sample, repeat)
+
+
+class OffscreenWindow:
+    current_source = 'nixpkgs'
+
+    def show_detail(self, app_id, source_type='local_appstream'):
+        pass
+
+    def prefetch_detail(self, app_id, source_type):
+        pass
+
+
+def bench_pages(conn, results, repeat):
+    try:
+        from gi.repository import Gtk
+        from landing import create_landing
+        from search_page import SearchPage, SEARCH_PAGE_SIZE
+    except ImportError as e:
+        results['pages'] = f'skipped: {e}'
+        return
+
+    if not Gtk.init_check():
+        results['pages'] = 'skipped: no display available'
+        return
+
+    window = OffscreenWindow()
+    for source in QUERY_SOURCES:
+        window.current_source = source
+        results[f'create_landing[{source}]'] = _repeat(
+            create_landing,
+            [(None, window, category) for category in catalog.ROTATION_CATEGORIES], repeat)
+
+        pages = [catalog.search_local_apps(conn, query, SEARCH_PAGE_SIZE, source) for query in SEARCH_QUERIES]
+        results[f'SearchPage[{source}]'] = _repeat(SearchPage, [(apps, window) for apps in pages], repeat)
+
+
+def run_size(size, work_dir, repeat, with_pages):
+    yaml_path = os.path.join(work_dir, f'appstream-{size}.yml.gz')
+    xml_path = os.path.join(work_dir, f'flathub-{size}.xml.gz')
+    db_path = os.path.join(work_dir, f'catalog-{size}.db')
+
+    results = {'components': size}
+    start = time.perf_counter()
+    write_appstream_yaml(yaml_path, size)
+    write_flathub_xml(xml_path, size)
+    results['generate_catalogs'] = time.perf_counter() - start
+
+    catalog_paths.APPSTREAM_YAML_PATH = yaml_path
+    catalog_paths.FLATPAK_APPSTREAM_PATH = xml_path
+    catalog_db.DB_PATH = db_path
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(db_path + suffix):
+            os.unlink(db_path + suffix)
+
+    catalog_db.invalidate_setup()
+    conn = catalog_db.connection()
+    catalog.create_db(conn)
+    bench_ingest(conn, results)
+    # The catalog was just ingested by hand, so ensure_db() inside the page builders has nothing left to do.
+    catalog_db.ensure_setup(lambda conn: None)
+    results['database_bytes'] = os.path.getsize(db_path)
+
+    bench_queries(conn, results, repeat)
+    if with_pages:
+        bench_pages(conn, results, repeat)
+
+    catalog_db.close_connection()
+    return results
+
+
+def compare(baseline, current):
+    previous = {run['components']: run for run in baseline.get('runs', ())}
+    for run in current['runs']:
+        before = previous.get(run['components'])
+        if before is None:
+            continue
+        print(f"\n{run['components']} components")
+        for name, value in run.items():
+            old = before.get(name)
+            if isinstance(value, dict):
+                value, old = value['p50'], old['p50'] if isinstance(old, dict) else None
+            if not isinstance(value, float) or not isinstance(old, float) or not old:
+                continue
+            print(f"  {name:45} {old * 1000:10.2f} ms -> {value * 1000:10.2f} ms  ({(value / old - 1) * 100:+.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark catalog ingest, queries and page construction.")
+    parser.add_argument('--sizes', default=','.join(map(str, DEFAULT_SIZES)),
+                        help="comma-separated component counts (default: %(default)s)")
+    parser.add_argument('--repeat', type=int, default=5, help="passes over each query set")
+    parser.add_argument('--output', default='bench_output.json', help="where to write the JSON results")
+    parser.add_argument('--baseline', help="earlier results to compare against")
+    parser.add_argument('--work-dir', help="keep generated catalogs and databases here")
+    parser.add_argument('--no-pages', action='store_true', help="skip building GTK pages")
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(',') if size]
+    report = {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'machine': platform.machine(),
+            'repeat': args.repeat,
+        },
+        'runs': [],
+    }
+
+    with tempfile.TemporaryDirectory(prefix='alloy-bench-') as temp_dir:
+        work_dir = args.work_dir or temp_dir
+        os.makedirs(work_dir, exist_ok=True)
+        for size in sizes:
+            print(f"benchmarking {size} components...", file=sys.stderr)
+            report['runs'].append(run_size(size, work_dir, args.repeat, not args.no_pages))
+
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"results written to {args.output}", file=sys.stderr)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            compare(json.load(f), report)
+
+
+if __name__ == '__main__':
+    main()
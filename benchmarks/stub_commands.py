@@ -0,0 +1,193 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+APP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app')
+sys.path.insert(0, APP_DIR)
+
+# Long enough that finishing early can only mean the backend stopped waiting for the stub.
+STUB_HANG_SECONDS = 30
+
+NIX_SEARCH_LIMIT = 3
+
+# The stubs log every invocation to $STUB_LOG; `nix search` also leaves its PID next to it.
+# Queries pick the behaviour: "hang" never answers, "complete" prints a whole document and
+# exits, anything else streams five entries and then hangs without closing the document.
+NIX_STUB = f'''#!/bin/sh
+echo "nix $*" >> "$STUB_LOG"
+if [ "$1" = search ]; then
+    echo $$ > "$STUB_LOG.pid"
+    case "$4" in
+    hang) exec sleep {STUB_HANG_SECONDS} ;;
+    complete) echo '{{"legacyPackages.x86_64-linux.hello":{{"description":"d","version":"1"}}}}'; exit 0 ;;
+    esac
+    printf '{{'
+    for i in 0 1 2 3 4; do
+        printf '"legacyPackages.x86_64-linux.pkg%s":{{"description":"d","version":"1"}},' $i
+    done
+    exec sleep {STUB_HANG_SECONDS}
+fi
+for arg in "$@"; do
+    case "$arg" in *broken*) echo "error: attribute '$arg' missing" >&2; exit 1 ;; esac
+done
+printf 'copying 1/2\\rcopying 2/2\\n'
+'''
+
+FLATPAK_STUB = '''#!/bin/sh
+echo "flatpak $*" >> "$STUB_LOG"
+echo "Installing $#"
+'''
+
+
+def write_stub(directory, name, body):
+    path = os.path.join(directory, name)
+    with open(path, 'w') as f:
+        f.write(body)
+    os.chmod(path, 0o755)
+    return path
+
+
+def read_log(log_path):
+    try:
+        with open(log_path) as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return []
+    os.unlink(log_path)
+    return lines
+
+
+def wait_for(jobs, timeout):
+    deadline = time.monotonic() + timeout
+    while not all(job.finished for job in jobs) and time.monotonic() < deadline:
+        time.sleep(0.05)
+
+
+def check_install_queue(stub_dir, log_path):
+    from install_queue import InstallQueue, NIX_USER, FLATPAK, DONE, FAILED
+
+    failures = []
+    queue = InstallQueue(os.path.join(stub_dir, 'nix'), os.path.join(stub_dir, 'flatpak'), batch_delay=0.2)
+
+    # Clicks inside one batch delay become one transaction per backend.
+    jobs = [queue.install(NIX_USER, 'hello'), queue.install(NIX_USER, 'cowsay'),
+            queue.install(FLATPAK, 'org.example.A', 'flathub'), queue.install(FLATPAK, 'org.example.B', 'flathub')]
+    if queue.install(NIX_USER, 'hello') is not jobs[0]:
+        failures.append("a second click on a queued app queued it again")
+    wait_for(jobs, 10)
+    calls = sorted(read_log(log_path))
+    expected = sorted(['nix profile install nixpkgs#hello nixpkgs#cowsay',
+                       'flatpak install --user --noninteractive -y flathub org.example.A org.example.B'])
+    if calls != expected:
+        failures.append(f"batched installs ran {calls}, expected {expected}")
+    if any(job.state != DONE for job in jobs):
+        failures.append(f"batched installs ended as {jobs}")
+
+    # A package that fails the batch sends the others through again on their own.
+    jobs = [queue.install(NIX_USER, 'first'), queue.install(NIX_USER, 'broken'), queue.install(NIX_USER, 'second')]
+    wait_for(jobs, 10)
+    calls = read_log(log_path)
+    expected = ['nix profile install nixpkgs#first nixpkgs#broken nixpkgs#second',
+                'nix profile install nixpkgs#first', 'nix profile install nixpkgs#broken',
+                'nix profile install nixpkgs#second']
+    if calls != expected:
+        failures.append(f"a failed batch ran {calls}, expected {expected}")
+    if [job.state for job in jobs] != [DONE, FAILED, DONE]:
+        failures.append(f"a failed batch ended as {jobs}")
+    elif 'broken' not in jobs[1].message:
+        failures.append(f"the failed install reported {jobs[1].message!r} instead of nix's error")
+
+    print(f"install queue: {len(failures)} failures")
+    return failures
+
+
+def _process_gone(pid):
+    try:
+        with open(f'/proc/{pid}/stat') as f:
+            return f.read().rsplit(')', 1)[1].split()[0] == 'Z'
+    except OSError:
+        return True
+
+
+def run_nix_search(query, limit, timeout_ms):
+    from gi.repository import GLib
+    from nix_search import search_nixpkgs_apps
+
+    loop = GLib.MainLoop()
+    answers = []
+
+    def on_done(results):
+        answers.append(results)
+        loop.quit()
+
+    start = time.perf_counter()
+    search_nixpkgs_apps(query, limit, on_done, timeout_ms=timeout_ms)
+    # The loop only ends without an answer when this fires, which also removes it.
+    timeout_id = GLib.timeout_add_seconds(STUB_HANG_SECONDS, loop.quit)
+    loop.run()
+    if answers:
+        GLib.source_remove(timeout_id)
+    return (answers[0] if answers else None), time.perf_counter() - start
+
+
+def check_nix_search(log_path):
+    from gi.repository import GLib
+
+    failures = []
+
+    # Enough entries arrive long before the stub would exit, so the search stops it.
+    results, elapsed = run_nix_search('stream', NIX_SEARCH_LIMIT, STUB_HANG_SECONDS * 2000)
+    with open(log_path + '.pid') as f:
+        pid = int(f.read())
+    deadline = time.monotonic() + 2
+    while not _process_gone(pid) and time.monotonic() < deadline:
+        GLib.MainContext.default().iteration(False)
+        time.sleep(0.01)
+    if results is None or len(results) != NIX_SEARCH_LIMIT or elapsed > STUB_HANG_SECONDS / 2:
+        failures.append(f"streaming search returned {results!r} after {elapsed:.1f} s, "
+                        f"expected {NIX_SEARCH_LIMIT} results right away")
+    if not _process_gone(pid):
+        failures.append("nix kept running after the search had enough results")
+
+    results, elapsed = run_nix_search('hang', NIX_SEARCH_LIMIT, 500)
+    if results != [] or elapsed > STUB_HANG_SECONDS / 2:
+        failures.append(f"a silent nix returned {results!r} after {elapsed:.1f} s, expected [] at the timeout")
+
+    results, elapsed = run_nix_search('complete', NIX_SEARCH_LIMIT, STUB_HANG_SECONDS * 2000)
+    if results is None or [card.id for card in results] != ['legacyPackages.x86_64-linux.hello']:
+        failures.append(f"a complete document returned {results!r}")
+
+    read_log(log_path)
+    print(f"nix search: {len(failures)} failures")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Check install batching and nix search early exit against stub nix and flatpak commands.")
+    parser.parse_args()
+
+    failures = []
+    with tempfile.TemporaryDirectory(prefix='alloy-stubs-') as stub_dir:
+        log_path = os.path.join(stub_dir, 'calls.log')
+        write_stub(stub_dir, 'nix', NIX_STUB)
+        write_stub(stub_dir, 'flatpak', FLATPAK_STUB)
+        os.environ['STUB_LOG'] = log_path
+        # nix search runs whatever `nix` is first on PATH.
+        os.environ['PATH'] = stub_dir + os.pathsep + os.environ.get('PATH', '')
+
+        failures += check_install_queue(stub_dir, log_path)
+        try:
+            failures += check_nix_search(log_path)
+        except ImportError as e:
+            print(f"skipping nix search: {e}")
+
+    for failure in failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+import argparse
+import gzip
+import json
+import random
+from xml.sax.saxutils import escape
+
+SYLLABLES = (
+    'al', 'bo', 'ca', 'de', 'fi', 'go', 'ha', 'ix', 'jo', 'ka', 'lu', 'me', 'no', 'pa', 'qu',
+    'ri', 'so', 'ta', 'ul', 've', 'wa', 'xe', 'yo', 'za', 'fox', 'nix', 'tux', 'gim', 'kde', 'gno',
+)
+
+WORDS = (
+    'editor', 'browser', 'player', 'viewer', 'manager', 'studio', 'terminal', 'client', 'game',
+    'chess', 'music', 'video', 'photo', 'office', 'notes', 'mail', 'chat', 'server', 'monitor',
+    'calendar', 'reader', 'writer', 'draw', 'paint', 'code', 'debugger', 'compiler', 'network',
+    'backup', 'sync', 'audio', 'screen', 'recorder', 'map', 'weather', 'clock', 'font', 'archive',
+)
+
+CATEGORIES = (
+    ('Game', 'ArcadeGame'), ('Game', 'BoardGame'), ('Game', 'StrategyGame'), ('Network', 'WebBrowser'),
+    ('Network', 'Chat'), ('Network', 'Email'), ('Office', 'WordProcessor'), ('Office', 'Spreadsheet'),
+    ('Development', 'IDE'), ('Development', 'Debugger'), ('Graphics', 'RasterGraphics'),
+    ('AudioVideo', 'Player'), ('Utility', 'TextEditor'), ('System', 'Monitor'),
+)
+
+LICENSES = ('GPL-3.0-or-later', 'MIT', 'Apache-2.0', 'BSD-3-Clause', 'MPL-2.0', 'LicenseRef-proprietary')
+
+# Roughly what the real catalogs contain besides desktop applications.
+NON_APP_RATIO = 0.1
+
+
+class SyntheticComponent:
+    __slots__ = ('index', 'name', 'summary', 'paragraphs', 'bullets', 'categories', 'keywords',
+                 'license', 'developer', 'screenshots', 'translated_name', 'is_app')
+
+    def __init__(self, rng, index):
+        self.index = index
+        self.name = ''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))).capitalize()
+        self.summary = ' '.join(rng.choice(WORDS) for _ in range(rng.randint(3, 8))).capitalize()
+        self.paragraphs = [
+            ' '.join(rng.choice(WORDS + SYLLABLES) for _ in range(rng.randint(15, 60)))
+            for _ in range(rng.randint(1, 3))
+        ]
+        self.bullets = [' '.join(rng.choice(WORDS) for _ in range(rng.randint(2, 6))) for _ in range(rng.randint(0, 5))]
+        self.categories = rng.choice(CATEGORIES)
+        self.keywords = rng.sample(WORDS, rng.randint(0, 4))
+        self.license = rng.choice(LICENSES)
+        self.developer = f"{rng.choice(SYLLABLES).capitalize()} {rng.choice(WORDS).capitalize()} Team"
+        self.screenshots = rng.randint(0, 4)
+        self.translated_name = rng.random() < 0.3
+        self.is_app = rng.random() >= NON_APP_RATIO
+
+    @property
+    def slug(self):
+        return f"{self.name.lower()}{self.index}"
+
+    def description_html(self):
+        html = ''.join(f"<p>{paragraph}</p>" for paragraph in self.paragraphs)
+        if self.bullets:
+            html += '<ul>' + ''.join(f"<li>{bullet}</li>" for bullet in self.bullets) + '</ul>'
+        return html
+
+
+def synthetic_components(count, seed=0):
+    rng = random.Random(seed)
+    for index in range(count):
+        yield SyntheticComponent(rng, index)
+
+
+def _yaml_string(value):
+    # JSON strings are valid YAML double-quoted scalars.
+    return json.dumps(value, ensure_ascii=False)
+
+
+def write_appstream_yaml(path, count, seed=0):
+    with gzip.open(path, 'wt', encoding='utf-8', compresslevel=1) as f:
+        f.write('---\nFile: DEP-11\nVersion: "0.12"\nOrigin: nixos\n')
+        for component in synthetic_components(count, seed):
+            f.write('---\n')
+            f.write(f"Type: {'desktop-application' if component.is_app else 'addon'}\n")
+            f.write(f"ID: org.synthetic.{component.slug}.desktop\n")
+            f.write(f"Name:\n  C: {_yaml_string(component.name)}\n")
+            if component.translated_name:
+                f.write(f"  de: {_yaml_string(component.name + ' DE')}\n")
+            f.write(f"Summary:\n  C: {_yaml_string(component.summary)}\n")
+            f.write(f"Description:\n  C: {_yaml_string(component.description_html())}\n")
+            f.write(f"Icon:\n  cached:\n  - name: {component.slug}.png\n    width: 64\n    height: 64\n")
+            f.write(f"Developer:\n  name:\n    C: {_yaml_string(component.developer)}\n")
+            f.write(f"ProjectLicense: {component.license}\n")
+            f.write(f"Url:\n  homepage: https://example.org/{component.slug}\n")
+            f.write('Categories:\n' + ''.join(f"- {category}\n" for category in component.categories))
+            if component.keywords:
+                f.write('Keywords:\n  C:\n' + ''.join(f"  - {keyword}\n" for keyword in component.keywords))
+            if component.screenshots:
+                f.write('Screenshots:\n')
+                for shot in range(component.screenshots):
+                    f.write(f"- source-image:\n    url: https://example.org/{component.slug}/{shot}.png\n")
+
+
+def write_flathub_xml(path, count, seed=0):
+    with gzip.open(path, 'wt', encoding='utf-8', compresslevel=1) as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n<components version="0.14" origin="flathub">\n')
+        for component in synthetic_components(count, seed + 1):
+            app_id = f"org.synthetic.{component.name}{component.index}"
+            f.write(f"<component type=\"{'desktop-application' if component.is_app else 'runtime'}\">")
+            f.write(f"<id>{app_id}</id>")
+            if component.translated_name:
+                f.write(f"<name xml:lang=\"de\">{escape(component.name)} DE</name>")
+            f.write(f"<name>{escape(component.name)}</name><summary>{escape(component.summary)}</summary>")
+            f.write(f"<description>{component.description_html()}</description>")
+            f.write(f"<icon type=\"cached\" width=\"64\" height=\"64\">{app_id}.png</icon>")
+            f.write(f"<developer_name>{escape(component.developer)}</developer_name>")
+            f.write(f"<project_license>{component.license}</project_license>")
+            f.write(f"<url type=\"homepage\">https://example.org/{component.slug}</url>")
+            if component.screenshots:
+                f.write('<screenshots>' + ''.join(
+                    f"<screenshot><image type=\"source\">https://example.org/{component.slug}/{shot}.png</image></screenshot>"
+                    for shot in range(component.screenshots)) + '</screenshots>')
+            f.write('<categories>' + ''.join(f"<category>{category}</category>" for category in component.categories) + '</categories>')
+            if component.keywords:
+                f.write('<keywords>' + ''.join(f"<keyword>{keyword}</keyword>" for keyword in component.keywords) + '</keywords>')
+            f.write('</component>\n')
+        f.write('</components>\n')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write synthetic AppStream catalogs.")
+    parser.add_argument('count', type=int)
+    parser.add_argument('--yaml', help="path of the AppStream YAML (.yml.gz) to write")
+    parser.add_argument('--xml', help="path of the Flathub appstream XML (.xml.gz) to write")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    if args.yaml:
+        write_appstream_yaml(args.yaml, args.count, args.seed)
+    if args.xml:
+        write_flathub_xml(args.xml, args.count, args.seed)
+
+
+if __name__ == '__main__':
+    main()